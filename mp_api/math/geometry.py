@@ -9,6 +9,8 @@ class Point2:
         y (T_Num): y坐标。
     """
 
+    __slots__ = ('x', 'y')
+
     def __init__(self, x: T_Num, y: T_Num):
         """使用给定的坐标初始化一个新的Point2。
 
@@ -37,6 +39,8 @@ class Point3:
         z (T_Num): z坐标。
     """
 
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x: T_Num, y: T_Num, z: T_Num):
         """使用给定的坐标初始化一个新的Point3。
 
@@ -185,6 +189,8 @@ class Vector2:
         y (T_Num): y分量。
     """
 
+    __slots__ = ('x', 'y')
+
     def __init__(self, x: T_Num, y: T_Num):
         """使用给定的分量初始化一个新的Vector2。
 
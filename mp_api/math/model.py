@@ -1,11 +1,9 @@
 import math
 from enum import Enum
-from typing import List
 
 import numpy as np
 
 from .geometry import Point3
-from .utils import arithmetic_sequence
 from ..typing import T_Num
 
 
@@ -28,9 +26,9 @@ class PointModel:
     """
 
     @staticmethod
-    def cube(length: T_Num, density: T_Num, anchor: Point3 = Point3(0.5, 0.5, 0.5), mode: str = ModeEnum.SURFACE) -> list[Point3]:
+    def cube_array(length: T_Num, density: T_Num, anchor: Point3 = Point3(0.5, 0.5, 0.5), mode: str = ModeEnum.SURFACE) -> np.ndarray:
         """
-        返回立方体模型的点组。
+        返回立方体模型的点组数组，点的顺序与cube相同。
         Args:
             length: 边长
             density: 密度: 单位长度内的点数
@@ -38,90 +36,106 @@ class PointModel:
             mode: 取点模式: 支持DOT、LINE、SURFACE和SOLID
 
         Returns:
-            list[Point3]: 点组
+            np.ndarray: 形状为(N, 3)的点组
         """
         num_per_side = int(density * length)
-        points = []
-        points_per_side = arithmetic_sequence(0, length, num_per_side)
-        dx = -length * anchor.x
-        dy = -length * anchor.y
-        dz = -length * anchor.z
+        points_per_side = np.linspace(0, length, num_per_side)
+        ends = np.array([0, length], dtype=np.float64)
+        offset = -length * np.array([anchor.x, anchor.y, anchor.z], dtype=np.float64)
 
         if mode == ModeEnum.VERTEX:
-            for x in [0, length]:
-                for y in [0, length]:
-                    for z in [0, length]:
-                        points.append(Point3(x + dx, y + dy, z + dz))
-
+            axes = (ends, ends, ends)
         elif mode == ModeEnum.LINE:
-            for i in points_per_side:
-                for j in [0, length]:
-                    for k in [0, length]:
-                        points.append(Point3(i + dx, j + dy, k + dz))
-                        points.append(Point3(k + dx, i + dy, j + dz))
-                        points.append(Point3(j + dx, k + dy, i + dz))
-
+            axes = (points_per_side, ends, ends)
         elif mode == ModeEnum.SURFACE:
-            for i in points_per_side:
-                for j in points_per_side:
-                    for k in [0, length]:
-                        points.append(Point3(i + dx, j + dy, k + dz))
-                        points.append(Point3(k + dx, i + dy, j + dz))
-                        points.append(Point3(j + dx, k + dy, i + dz))
-
+            axes = (points_per_side, points_per_side, ends)
         elif mode == ModeEnum.SOLID:
-            for x in points_per_side:
-                for y in points_per_side:
-                    for z in points_per_side:
-                        points.append(Point3(x + dx, y + dy, z + dz))
-
+            axes = (points_per_side, points_per_side, points_per_side)
         else:
             raise ValueError(f"不支持的模式: {mode}")
 
-        return points
+        i, j, k = (a.reshape(-1) for a in np.meshgrid(*axes, indexing='ij'))
+        if mode in (ModeEnum.LINE, ModeEnum.SURFACE):
+            # 每组(i, j, k)轮换出三个方向的边/面
+            points = np.stack([np.stack([i, j, k], axis=-1),
+                               np.stack([k, i, j], axis=-1),
+                               np.stack([j, k, i], axis=-1)], axis=1).reshape(-1, 3)
+        else:
+            points = np.stack([i, j, k], axis=-1)
+        return points + offset
 
     @staticmethod
-    def sphere_ave(radius: T_Num, density: T_Num, mode: str = ModeEnum.SURFACE) -> list[Point3]:
+    def cube(length: T_Num, density: T_Num, anchor: Point3 = Point3(0.5, 0.5, 0.5), mode: str = ModeEnum.SURFACE) -> list[Point3]:
+        """
+        返回立方体模型的点组，参数见cube_array。
+
+        Returns:
+            list[Point3]: 点组
+        """
+        return [Point3(x, y, z) for x, y, z in PointModel.cube_array(length, density, anchor, mode).tolist()]
+
+    @staticmethod
+    def sphere_ave_array(radius: T_Num, density: T_Num, mode: str = ModeEnum.SURFACE) -> np.ndarray:
         """
-        返回球体模型的点组(均匀取点)
+        返回球体模型的点组数组(斐波那契球均匀取点)
         公式支持@不背完牛津高阶不改名
         Args:
             radius: 半径
             density: 密度: 单位面积内的点数
             mode: 取点模式: 仅支持SURFACE和SOLID
 
+        Returns:
+            np.ndarray: 形状为(N, 3)的点组
+        """
+        if mode not in (ModeEnum.SURFACE, ModeEnum.SOLID):
+            raise ValueError(f"不支持的模式: {mode}")
+        surface_area = 4 * math.pi * radius ** 2
+        num = int(surface_area * density)
+        i = np.arange(1, num + 1)
+        phi = np.arccos(-1 + (2.0 * i - 1.0) / num)  # φ
+        theta = math.sqrt(num * math.pi) * phi  # θ
+        return radius * np.stack([np.cos(theta) * np.sin(phi), np.sin(theta) * np.sin(phi), np.cos(phi)], axis=-1)
+
+    @staticmethod
+    def sphere_ave(radius: T_Num, density: T_Num, mode: str = ModeEnum.SURFACE) -> list[Point3]:
+        """
+        返回球体模型的点组(均匀取点)，参数见sphere_ave_array。
+
         Returns:
             list[Point3]: 点组
         """
-        points: List[Point3] = []
+        return [Point3(x, y, z) for x, y, z in PointModel.sphere_ave_array(radius, density, mode).tolist()]
 
-        surface_area = 4 * math.pi * radius ** 2
-        num = surface_area * density
-        for i in range(num):
-            r_temp = radius
-            phi = math.acos(-1 + ((2.0 * i - 1.0) / num))  # φ
-            theta = math.sqrt(num * math.pi) * phi  # θ
-            x = r_temp * math.cos(theta) * math.sin(phi)
-            y = r_temp * math.sin(theta) * math.sin(phi)
-            z = r_temp * math.cos(phi)
-            points.append(Point3(x, y, z))
+    @staticmethod
+    def sphere_cube_array(radius: T_Num, density: T_Num, mode: str = ModeEnum.SURFACE) -> np.ndarray:
+        """
+        返回球体模型的点组数组(遍历立方体取点)
+        Args:
+            radius: 半径
+            density: 密度: 单位长度内的点数(与cube有关)
+            mode: 取点模式: 仅支持SURFACE和SOLID
+
+        Returns:
+            np.ndarray: 形状为(N, 3)的点组
+        """
+        num_per_side = int(density * 2 * radius)
+        axis = np.linspace(-radius, radius, num_per_side)
+        step = axis[1] - axis[0] if num_per_side > 1 else 2 * radius
+        distance = np.sqrt(axis[:, None, None] ** 2 + axis[None, :, None] ** 2 + axis[None, None, :] ** 2)
         if mode == ModeEnum.SURFACE:
-            return points
+            mask = np.abs(distance - radius) < step / 2
         elif mode == ModeEnum.SOLID:
-            return points
+            mask = distance <= radius
         else:
             raise ValueError(f"不支持的模式: {mode}")
+        return axis[np.argwhere(mask)]
 
     @staticmethod
     def sphere_cube(radius: T_Num, density: T_Num, mode: str = ModeEnum.SURFACE) -> list[Point3]:
         """
-        返回球体模型的点组(遍历立方体取点)
-        Args:
-            radius: 半径
-            density: 密度: 单位长度内的点数(与cube有关)
-            mode: 取点模式: 仅支持SURFACE和SOLID
+        返回球体模型的点组(遍历立方体取点)，参数见sphere_cube_array。
 
         Returns:
             list[Point3]: 点组
         """
-        pass
+        return [Point3(x, y, z) for x, y, z in PointModel.sphere_cube_array(radius, density, mode).tolist()]
@@ -1,14 +1,51 @@
+import importlib
 import sys
 
-from .canvas import *
-from .draw import *
-from .event import *
-from .mp_math import *
-from .mp_typing import *
-from .particle import *
-from .particle_line import *
-from .save import *
-from .style import *
-from .utils import *
+# 子模块按需加载(PEP 562)，避免导入时就加载sympy、PIL、nonebot等重量级依赖
+# 顺序与原先的星号导入一致，同名时后面的模块优先
+_submodule_exports = {
+    'bake': ['bake_line', 'bake_seq'],
+    'budget': ['ParticleBudget', 'event_particles', 'function_particles', 'particle_life', 'poisson_decimate'],
+    'canvas': ['default_color', 'default_font', 'render_canvas_from_json', 'BasePanel', 'Canvas', 'Panel',
+               'TextSegment', 'Text', 'Img', 'Rectangle', 'Shape', 'Utils'],
+    'draw': ['Color', 'ColorArray', 'CColor'],
+    'event': ['BaseEvent', 'ExecuteEvent', 'FillEvent', 'FunctionEvent', 'ParticleEvent', 'ParticleEventBatch',
+              'ScheduleEvent', 'SetBlockEvent', 'MCFunction'],
+    'fit': ['fit_best_particle', 'fit_expression'],
+    'mp_math': ['Note', 'Point2', 'Point3', 'Point3List', 'Point3View', 'PointCloud3', 'Line2', 'Line3', 'Segment2',
+                'Arc2', 'Arc2Array', 'Vector2', 'Vector3', 'line2by2p', 'clamp'],
+    'mp_typing': ['T_Num', 'T_Pos', 'T_Vec3', 'T_Exp', 'T_ARGB', 'T_RGB', 'T_Color'],
+    'particle': ['BaseParticle', 'BestParticle', 'ColorLifeParticle', 'ColorLifeScaleTextureParticle', 'SeqParticle',
+                 'SeqtParticle'],
+    'particle_line': ['ParticleLine', 'arc22pl', 'arc2s2point3s'],
+    'save': ['OutputStats', 'Save', 'ResourcePack'],
+    'simulator': ['SimulationReport', 'Simulator', 'particle_count'],
+    'sink': ['BufferedFileSink'],
+    'style': ['points_2_group', 'points_2_group_array', 'connect_points', 'Soma', 'Struct', 'Animation'],
+    'timeline': ['Timeline', 'dispatch_tree'],
+    'utils': ['Enum', 'ExprTemplate', 'TraceExp', 'func2math_exp', 'delta', 'mp_clamp', 'mp_min', 'mp_max', 'mp_if', 'mp_deg',
+              'mp_radian', 'mp_and', 'mp_or', 'mp_rgb', 'mp_sin', 'mp_cos', 'mp_t', 'round_constant'],
+}
+_name_to_module = {name: module for module, names in _submodule_exports.items() for name in names}
+_submodules = {'config', 'benchmark', *_submodule_exports}
+
+__all__ = list(_name_to_module)
+
+
+def __getattr__(name: str):
+    if name in _name_to_module:
+        value = getattr(importlib.import_module(f'.{_name_to_module[name]}', __name__), name)
+    elif name in _submodules:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _submodules)
+
+
 # 禁用科学计数法
 sys.float_representation = 'decimal'
@@ -0,0 +1,115 @@
+import math
+from typing import List, Sequence
+
+import numpy as np
+
+from .event import ParticleEvent
+from .mp_typing import T_Num
+from .particle import SeqParticle, SeqtParticle
+from .particle_line import ParticleLine
+from .utils import round_constant
+
+
+def _per_trajectory(values, n: int, t: int, name: str) -> np.ndarray | None:
+    """Broadcast per-tick values of shape (T,) or (N, T) to (N, T)."""
+    if values is None:
+        return None
+    array = np.asarray(values)
+    if array.ndim == 1:
+        array = np.broadcast_to(array, (n, len(array)))
+    if array.shape != (n, t):
+        raise ValueError(f'{name} has shape {array.shape}, expected ({t},) or ({n}, {t})')
+    return array
+
+
+def _trimmed_length(columns: List[np.ndarray]) -> np.ndarray:
+    """Get the length of every row once the trailing values repeating the value before them are dropped.
+
+    Args:
+        columns (List[np.ndarray]): Arrays of shape (N, T), trimmed together.
+
+    Returns:
+        np.ndarray: Lengths with shape (N,), at least 1.
+    """
+    n, t = columns[0].shape
+    changed = np.zeros((n, t), dtype=bool)
+    changed[:, 0] = True
+    for column in columns:
+        changed[:, 1:] |= column[:, 1:] != column[:, :-1]
+    return t - np.argmax(changed[:, ::-1], axis=1)
+
+
+def bake_seq(trajectories: np.ndarray, start_time: T_Num | Sequence[T_Num] = 0, precision: int = 3,
+             trim: bool = True, colors=None, scales=None, life: int = None, rand: int = 1,
+             texture: str = None, force: str = 'force', player: str = '@a') -> List[ParticleEvent]:
+    """Bake trajectories into one SeqParticle (or SeqtParticle) event each.
+
+    Every trajectory is spawned at its first point and its lists hold the offsets from that point,
+    rounded to `precision` decimals, so the descriptors stay short and the error is at most
+    0.5 * 10 ** -precision blocks, without drift. With trim set, trailing ticks that repeat the
+    previous position, color and scale are dropped and `life` keeps the particle alive for all
+    ticks, which relies on the particle holding the last values of its lists.
+
+    Args:
+        trajectories (np.ndarray): Positions with shape (N, T, 3), T ticks of N particles, or (T, 3).
+        start_time (T_Num | Sequence[T_Num], optional): Spawn tick of all or of every trajectory (0 by default).
+        precision (int, optional): Decimals kept in the position and scale lists (3 by default).
+        trim (bool, optional): Drop redundant trailing values (True by default).
+        colors (optional): Colors of every tick, shape (T,) or (N, T), None for the default color.
+        scales (optional): Scales of every tick, shape (T,) or (N, T), None for the default scale.
+        life (int, optional): Life of the particles (T by default).
+        rand (int, optional): Rand of the particles (1 by default).
+        texture (str, optional): Bake SeqtParticles with this texture (None by default, SeqParticles).
+        force (str, optional): Force mode ('force' by default).
+        player (str, optional): Target player ('@a' by default).
+
+    Returns:
+        List[ParticleEvent]: One event per trajectory, at its start time.
+    """
+    trajectories = np.asarray(trajectories, dtype=np.float64)
+    if trajectories.ndim == 2:
+        trajectories = trajectories[None]
+    if trajectories.ndim != 3 or trajectories.shape[2] != 3 or trajectories.shape[1] == 0:
+        raise ValueError(f'Trajectories must have shape (N, T, 3), got {trajectories.shape}')
+    n, t, _ = trajectories.shape
+    start_time = np.broadcast_to(np.asarray(start_time), (n,)).tolist()
+    colors = _per_trajectory(colors, n, t, 'colors')
+    scales = _per_trajectory(scales, n, t, 'scales')
+
+    starts = trajectories[:, 0]
+    offsets = round_constant(trajectories - starts[:, None], precision)
+    if scales is not None:
+        scales = round_constant(scales, precision)
+    columns = [offsets[..., 0], offsets[..., 1], offsets[..., 2]]
+    columns += [c for c in (colors, scales) if c is not None]
+    lengths = _trimmed_length(columns) if trim else np.full(n, t)
+
+    events = []
+    x_lists, y_lists, z_lists = [c.tolist() for c in columns[:3]]
+    color_lists = colors.tolist() if colors is not None else None
+    scale_lists = scales.tolist() if scales is not None else None
+    for i, (length, pos) in enumerate(zip(lengths.tolist(), starts.tolist())):
+        lists = [x_lists[i][:length], y_lists[i][:length], z_lists[i][:length], life or t, rand,
+                 color_lists[i][:length] if color_lists is not None else None,
+                 scale_lists[i][:length] if scale_lists is not None else None]
+        particle = SeqParticle(*lists) if texture is None else SeqtParticle(*lists, texture=texture)
+        events.append(ParticleEvent(particle, tuple(pos), force=force, player=player, time=start_time[i]))
+    return events
+
+
+def bake_line(line: ParticleLine, precision: int = 3, trim: bool = True, **kwargs) -> ParticleEvent:
+    """Bake a ParticleLine into one seq particle moving along it, one position per tick.
+
+    Args:
+        line (ParticleLine): The line, sampled from its start time to its end time.
+        precision (int, optional): Decimals kept in the lists (3 by default).
+        trim (bool, optional): Drop redundant trailing values (True by default).
+        **kwargs: Other arguments of bake_seq.
+
+    Returns:
+        ParticleEvent: The event, at the start time of the line.
+    """
+    duration = line.end_time - line.start_time
+    ticks = max(int(math.ceil(duration)), 0) + 1
+    p = np.minimum(np.arange(ticks) / duration, 1) if duration > 0 else np.zeros(1)
+    return bake_seq(line.get_pos_batch(p), line.start_time, precision, trim, **kwargs)[0]
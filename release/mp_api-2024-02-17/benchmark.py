@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+from typing import Tuple
+
+# from mp_api import ParticleEvent, MCFunction 的冷启动耗时上限
+import_time_limit: float = 0.1
+
+
+def import_time(statement: str = 'from mp_api import ParticleEvent, MCFunction', repeat: int = 5) -> float:
+    """
+    Measure the cold import time of a statement, each run in a fresh interpreter.
+    :param statement: import statement to run, 'mp_api' is replaced by this package's name
+    :param repeat: number of interpreters to start, the best run is returned
+    :return: seconds
+    """
+    package = __package__ or __name__.rsplit('.', 1)[0]
+    statement = statement.replace('mp_api', package)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get('PYTHONPATH', '')]))
+    code = f'import time\nstart = time.perf_counter()\n{statement}\nprint(time.perf_counter() - start)'
+    best = float('inf')
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+        best = min(best, float(result.stdout))
+    return best
+
+
+def dispatch_commands(num_ticks: int, fan_out: int = 2) -> Tuple[float, int]:
+    """
+    Count with the Simulator the commands a dispatch_tree over num_ticks tick functions runs per tick,
+    the tick functions are empty.
+    A linear chain of 'execute if score' runs num_ticks commands per tick.
+    :param num_ticks: number of tick functions
+    :param fan_out: fan-out of the tree
+    :return: mean and max commands per tick
+    """
+    from .event import MCFunction
+    from .simulator import Simulator
+    from .timeline import dispatch_tree
+    targets = {tick: MCFunction(f'tick_{tick}', namespace='bench') for tick in range(num_ticks)}
+    tree = dispatch_tree(targets, 'dispatch', 'mp_tick', '#bench', 'bench', fan_out)
+    simulator = Simulator.from_functions(tree + list(targets.values()))
+    counts = []
+    for tick in range(num_ticks):
+        simulator.set_score('#bench', 'mp_tick', tick)
+        counts.append(simulator.call('bench:dispatch'))
+    return sum(counts) / len(counts), max(counts)
+
+
+if __name__ == '__main__':
+    for fan_out in (2, 4, 8):
+        mean, peak = dispatch_commands(4096, fan_out)
+        print(f'Dispatch 4096 ticks, fan-out {fan_out}: {mean:.1f} commands/tick (max {peak}), linear chain: 4096')
+    seconds = import_time()
+    print(f'Import time: {seconds * 1000:.1f}ms, limit: {import_time_limit * 1000:.0f}ms')
+    sys.exit(0 if seconds <= import_time_limit else 1)
@@ -0,0 +1,295 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .event import BaseEvent, MCFunction, ParticleEvent, ParticleEventBatch
+from .particle import BaseParticle
+from .simulator import particle_count
+from .timeline import Timeline
+
+
+def particle_life(particle: BaseParticle) -> int:
+    """Get the life of a particle in ticks, 1 for particles without a life.
+
+    Args:
+        particle (BaseParticle): The particle.
+
+    Returns:
+        int: The life, at least 1.
+    """
+    return max(int(getattr(particle, 'life', 1) or 1), 1)
+
+
+def event_particles(event: BaseEvent) -> int:
+    """Get the number of particles spawned by an event, a count of 0 spawns one particle.
+
+    Args:
+        event (BaseEvent): The event, only ParticleEvent and ParticleEventBatch spawn particles.
+
+    Returns:
+        int: The number of particles.
+    """
+    if isinstance(event, ParticleEventBatch):
+        if isinstance(event.count, np.ndarray):
+            return int(np.maximum(event.count, 1).sum())
+        return len(event) * max(int(event.count), 1)
+    if isinstance(event, ParticleEvent):
+        return max(int(event.count), 1)
+    return 0
+
+
+def function_particles(function: MCFunction) -> int:
+    """Get the number of particles spawned by the particle commands of a function, without nested calls.
+
+    Args:
+        function (MCFunction): The function, its commands must be in memory.
+
+    Returns:
+        int: The number of particles.
+    """
+    return sum([particle_count(command.split()) for command in function.commands if command.startswith('particle ')])
+
+
+def _cell_keys(points: np.ndarray, size: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get the grid cell of every point, padded by one cell so neighbours of border cells stay valid.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Flat cell keys with shape (N,), the strides of the
+            x, y, z axes and the distance of every point to the centre of its cell.
+    """
+    scaled = (points - points.min(axis=0)) / size
+    cells = np.floor(scaled).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    strides = np.array([dims[1] * dims[2], dims[2], 1], dtype=np.int64)
+    return cells @ strides, strides, np.linalg.norm(scaled - cells + 0.5, axis=-1)
+
+
+def _outline_mask(keys: np.ndarray, strides: np.ndarray) -> np.ndarray:
+    """Mark the points whose cell has fewer occupied neighbour cells than the median cell.
+
+    Comparing with the median instead of looking for empty neighbours keeps working for
+    curves and for surfaces that are not aligned with the grid.
+    """
+    occupied, inverse = np.unique(keys, return_inverse=True)
+    neighbours = np.zeros(len(occupied), dtype=np.int64)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                neighbour = occupied + int(np.dot((dx, dy, dz), strides))
+                position = np.minimum(np.searchsorted(occupied, neighbour), len(occupied) - 1)
+                neighbours += occupied[position] == neighbour
+    return (neighbours < np.median(neighbours))[inverse.reshape(-1)]
+
+
+def _cell_representatives(points: np.ndarray, size: float, rank: np.ndarray, outline: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the point closest to the centre of every occupied cell, outline cells are split in half-size cells.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Indices of the representatives and the priority of every point
+            when trimming, lower first: outline points, then a random order.
+    """
+    keys, strides, distance = _cell_keys(points, size)
+    border = np.zeros(len(keys), dtype=bool)
+    if outline:
+        border = _outline_mask(keys, strides)
+        fine_keys, _, fine_distance = _cell_keys(points, size / 2)
+        keys = np.where(border, fine_keys * 2 + 1, keys * 2)
+        distance = np.where(border, fine_distance, distance)
+    order = np.lexsort((distance, keys))
+    sorted_keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return order[first], rank - len(rank) * border
+
+
+def poisson_decimate(points: np.ndarray, keep: int, outline: bool = True, seed: int | None = None,
+                     iterations: int = 32) -> np.ndarray:
+    """Pick a spatially uniform subset of points, an approximation of Poisson-disk sampling on a grid.
+
+    The cell size is searched so that keeping one point per occupied cell leaves just over `keep`
+    points, so the kept points are about one cell apart everywhere. With outline set, cells with
+    fewer occupied neighbours than usual are sampled at twice the density, so edges and ends of
+    shapes stay sharp.
+
+    Args:
+        points (np.ndarray): Points with shape (N, 3).
+        keep (int): Number of points to keep.
+        outline (bool, optional): Prefer points on the outline (True by default).
+        seed (int | None, optional): Seed of the random priority of the points.
+        iterations (int, optional): Steps of the cell size search (32 by default).
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points, `min(keep, N)` of them.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    n = len(points)
+    if keep >= n:
+        return np.arange(n)
+    if keep <= 0:
+        return np.empty(0, dtype=np.int64)
+    rank = np.random.default_rng(seed).permutation(n)
+    span = float(np.ptp(points, axis=0).max())
+    if span == 0:
+        return np.sort(np.argsort(rank)[:keep])
+
+    # The number of occupied cells shrinks as the cells grow, search the largest size keeping enough cells
+    low, high = np.log(span / keep), np.log(span * 2)
+    best, priority = _cell_representatives(points, np.exp(low), rank, outline)
+    if len(best) > keep:
+        for _ in range(iterations):
+            middle = (low + high) / 2
+            chosen, chosen_priority = _cell_representatives(points, np.exp(middle), rank, outline)
+            if len(chosen) >= keep:
+                low, best, priority = middle, chosen, chosen_priority
+            else:
+                high = middle
+            # Close enough, the few extra points are trimmed below
+            if len(best) - keep <= keep // 100:
+                break
+
+    if len(best) >= keep:
+        best = best[np.argsort(priority[best], kind='stable')[:keep]]
+    else:
+        # Too few occupied cells even at the smallest size, fill up with the best ranked remaining points
+        rest = np.setdiff1d(np.arange(n), best)
+        best = np.concatenate([best, rest[np.argsort(priority[rest], kind='stable')[:keep - len(best)]]])
+    return np.sort(best)
+
+
+class ParticleBudget(object):
+    def __init__(self, budget: int, weighted: bool = True, outline: bool = True, seed: int | None = None):
+        """Initialize a ParticleBudget, the analyzer and decimator of the particle load of a Timeline.
+
+        Args:
+            budget (int): Maximum number of particles per tick.
+            weighted (bool, optional): Compare the budget with the particles alive in a tick, each spawn
+                counted `count` times during its `life`, instead of the particles spawned in it (True by default).
+            outline (bool, optional): Prefer points on shape outlines when decimating (True by default).
+            seed (int | None, optional): Seed of the decimation.
+        """
+        if budget <= 0:
+            raise ValueError(f'Budget must be positive, got {budget}')
+        self.budget = budget
+        self.weighted = weighted
+        self.outline = outline
+        self.seed = seed
+
+    def spawned(self, timeline: Timeline) -> np.ndarray:
+        """Get the number of particles spawned in every tick.
+
+        Args:
+            timeline (Timeline): The timeline.
+
+        Returns:
+            np.ndarray: Array with one value per tick, from tick 0 to the last tick.
+        """
+        ticks = np.asarray(timeline._ticks, dtype=np.int64)
+        counts = np.fromiter(map(event_particles, timeline._events), dtype=np.int64, count=len(ticks))
+        return np.bincount(ticks, counts, minlength=ticks.max() + 1 if len(ticks) else 0).astype(np.int64)
+
+    def load(self, timeline: Timeline) -> np.ndarray:
+        """Get the particle load of every tick, the alive particles if weighted, the spawned ones otherwise.
+
+        Args:
+            timeline (Timeline): The timeline.
+
+        Returns:
+            np.ndarray: Array with one value per tick, up to the death of the last particles if weighted.
+        """
+        if not self.weighted:
+            return self.spawned(timeline)
+        ticks = np.asarray(timeline._ticks, dtype=np.int64)
+        counts = np.fromiter(map(event_particles, timeline._events), dtype=np.int64, count=len(ticks))
+        lives = np.fromiter([particle_life(e.particle) if c else 0 for e, c in zip(timeline._events, counts.tolist())],
+                            dtype=np.int64, count=len(ticks))
+        if not len(ticks):
+            return np.zeros(0, dtype=np.int64)
+        # Each spawn adds its count on its tick and removes it when it dies
+        change = np.zeros((ticks + lives).max() + 1, dtype=np.int64)
+        np.add.at(change, ticks, counts)
+        np.add.at(change, ticks + lives, -counts)
+        return np.cumsum(change)[:-1]
+
+    def over_budget(self, timeline: Timeline) -> List[int]:
+        """Get the ticks whose load exceeds the budget.
+
+        Args:
+            timeline (Timeline): The timeline.
+
+        Returns:
+            List[int]: The ticks.
+        """
+        return np.flatnonzero(self.load(timeline) > self.budget).tolist()
+
+    def keep_ratios(self, timeline: Timeline) -> Dict[int, float]:
+        """Get the share of particles to keep in every tick that spawns particles.
+
+        A spawn on tick t is scaled by budget / load over the ticks it stays alive, so after scaling
+        every tick it contributes to stays within the budget.
+
+        Args:
+            timeline (Timeline): The timeline.
+
+        Returns:
+            Dict[int, float]: Tick to ratio, 1 when nothing has to be dropped.
+        """
+        load = self.load(timeline)
+        life: Dict[int, int] = {}
+        for tick, event in zip(timeline._ticks, timeline._events):
+            if event_particles(event):
+                life[tick] = max(life.get(tick, 1), particle_life(event.particle) if self.weighted else 1)
+        return {tick: min(1.0, self.budget / max(int(load[tick:tick + span].max()), 1)) for tick, span in life.items()}
+
+    def decimate(self, timeline: Timeline) -> Timeline:
+        """Build a timeline whose particle load stays within the budget.
+
+        In every tick over budget the positioned particles of ParticleEvents and non-relative
+        ParticleEventBatches are pooled and decimated together with poisson_decimate. Other events,
+        relative batches and particles at '~' positions are kept as they are.
+
+        Args:
+            timeline (Timeline): The timeline, left unchanged.
+
+        Returns:
+            Timeline: A new timeline with the same settings.
+        """
+        result = Timeline(timeline.name, timeline.namespace, timeline.stream, timeline.mode, timeline.fan_out,
+                          timeline.objective, timeline.holder, timeline.dedup)
+        ratios = self.keep_ratios(timeline)
+        for tick, events in timeline.buckets():
+            ratio = ratios.get(tick, 1.0)
+            if ratio >= 1.0:
+                for event in events:
+                    result.add_event(event, tick)
+                continue
+
+            pool: List[Tuple[int, np.ndarray]] = []
+            for i, event in enumerate(events):
+                if isinstance(event, ParticleEventBatch) and not event.relative:
+                    pool.append((i, event.pos))
+                elif isinstance(event, ParticleEvent) and _is_position(event._pos):
+                    pool.append((i, np.asarray(event._pos, dtype=np.float64).reshape(1, 3)))
+            sizes = np.array([len(pos) for _, pos in pool], dtype=np.int64)
+            points = np.concatenate([pos for _, pos in pool]) if pool else np.empty((0, 3))
+            kept = np.zeros(len(points), dtype=bool)
+            kept[poisson_decimate(points, int(len(points) * ratio), self.outline, self.seed)] = True
+            masks = dict(zip([i for i, _ in pool], np.split(kept, np.cumsum(sizes)[:-1])))
+
+            for i, event in enumerate(events):
+                mask = masks.get(i)
+                if mask is None:
+                    result.add_event(event, tick)
+                elif isinstance(event, ParticleEventBatch):
+                    if mask.any():
+                        result.add_event(event.select(mask), tick)
+                elif mask[0]:
+                    result.add_event(event, tick)
+        return result
+
+
+def _is_position(pos) -> bool:
+    try:
+        [float(p) for p in pos]
+    except (TypeError, ValueError):
+        return False
+    return True
@@ -2,7 +2,6 @@ import os
 import uuid
 from typing import Tuple, Union, List
 
-import nonebot
 from PIL import Image, ImageFont, ImageDraw
 
 default_color = (255, 255, 255, 255)
@@ -516,6 +515,7 @@ class Utils:
             filename_without_end = ".".join(os.path.basename(img.fp.name).split(".")[0:-1]) + f"_{size[0]}x{size[1]}" + ".png"
             cache_file_path = os.path.join(".cache", filename_without_end)
             if os.path.exists(cache_file_path):
+                import nonebot
                 nonebot.logger.info("本次使用缓存加载图片，不裁剪")
                 return Image.open(os.path.join(".cache", filename_without_end))
         img_ratio = img.size[0] / img.size[1]
@@ -1,2 +1,14 @@
 max_thread: int = 4
-max_ncols: int = 100
\ No newline at end of file
+max_ncols: int = 100
+# 流式MCFunction每次刷写到文件的指令行数
+stream_buffer_size: int = 4096
+# Save.output()的默认写出后端: thread, process, async
+output_backend: str = 'thread'
+# Save.output()默认跳过内容未变化的函数
+incremental_output: bool = True
+# Save.output()是否删除命名空间中这次没有导出的函数文件，多个Save共用命名空间时不要开启
+prune_output: bool = False
+# func2math_exp表达式缓存的最大条目数
+expression_cache_size: int = 65536
+# MCFunction去重时等待合并的粒子指令的最大条数，只有粒子指令会被合并，重复的其他指令全部保留
+dedup_window: int = 65536
@@ -1,4 +1,8 @@
-from typing import Tuple
+import functools
+from typing import TYPE_CHECKING, Iterator, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class Color:
@@ -117,7 +121,7 @@ class Color:
 
     def __str__(self) -> str:
         """Return a string representation of the Color object."""
-        return f'Color {self.get_hex}'
+        return f'Color {self.get_hex()}'
 
     def __add__(self, other: 'Color') -> 'Color':
         """Perform addition of two colors.
@@ -150,6 +154,278 @@ class Color:
         return Color((result_a, result_r, result_g, result_b))
 
 
+@functools.lru_cache(maxsize=None)
+def _oklab_matrices() -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """Linear sRGB -> LMS and cbrt(LMS) -> OKLab matrices and their inverses.
+
+    See https://bottosson.github.io/posts/oklab/
+    """
+    import numpy as np
+    lms = np.array([[0.4122214708, 0.5363325363, 0.0514459929],
+                    [0.2119034982, 0.6806995451, 0.1073969566],
+                    [0.0883024619, 0.2817188376, 0.6299787005]])
+    lab = np.array([[0.2104542553, 0.7936177850, -0.0040720468],
+                    [1.9779984951, -2.4285922050, 0.4505937099],
+                    [0.0259040371, 0.7827717662, -0.8086757660]])
+    return lms, lab, np.linalg.inv(lms), np.linalg.inv(lab)
+
+
+def _rgb_to_oklab(rgb: 'np.ndarray') -> 'np.ndarray':
+    import numpy as np
+    lms, lab, _, _ = _oklab_matrices()
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return np.cbrt(linear @ lms.T) @ lab.T
+
+
+def _oklab_to_rgb(lab: 'np.ndarray') -> 'np.ndarray':
+    import numpy as np
+    _, _, lms_inv, lab_inv = _oklab_matrices()
+    linear = np.clip(((lab @ lab_inv.T) ** 3) @ lms_inv.T, 0, 1)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+
+def _rgb_to_hsv(rgb: 'np.ndarray') -> 'np.ndarray':
+    import numpy as np
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    v = rgb.max(axis=-1)
+    d = v - rgb.min(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = np.where(v == r, ((g - b) / d) % 6, np.where(v == g, (b - r) / d + 2, (r - g) / d + 4)) / 6
+        s = np.where(v == 0, 0, d / v)
+    return np.stack([np.where(d == 0, 0, h), s, v], axis=-1)
+
+
+def _hsv_to_rgb(hsv: 'np.ndarray') -> 'np.ndarray':
+    import numpy as np
+    h, s, v = hsv[..., 0] * 6, hsv[..., 1], hsv[..., 2]
+    i = np.floor(h).astype(np.int64) % 6
+    f = h - np.floor(h)
+    p, q, t = v * (1 - s), v * (1 - f * s), v * (1 - (1 - f) * s)
+    return np.stack([np.choose(i, [v, q, p, p, t, v]),
+                     np.choose(i, [t, v, v, q, p, p]),
+                     np.choose(i, [p, p, t, v, v, q])], axis=-1)
+
+
+class ColorArray:
+    def __init__(self, colors: 'ColorArray | np.ndarray | Sequence[Color | Tuple[int, ...] | int | str]'):
+        """Initialize a batch of colors stored as a uint8 ARGB array.
+
+        Args:
+            colors (ColorArray | np.ndarray | Sequence):
+                - ColorArray: Shares the underlying array.
+                - np.ndarray: ARGB values with shape (N, 4), or RGB values with shape (N, 3) (alpha is 255).
+                - Sequence: Anything Color accepts, converted one by one.
+        """
+        import numpy as np
+        if isinstance(colors, ColorArray):
+            self.argb = colors.argb
+        elif isinstance(colors, np.ndarray):
+            colors = np.clip(colors, 0, 255).astype(np.uint8)
+            if colors.ndim != 2 or colors.shape[1] not in (3, 4):
+                raise ValueError("Color format error")
+            if colors.shape[1] == 3:
+                colors = np.concatenate([np.full((len(colors), 1), 255, dtype=np.uint8), colors], axis=1)
+            self.argb = colors
+        else:
+            self.argb = np.array([Color(color).argb for color in colors], dtype=np.uint8).reshape(-1, 4)
+
+    @staticmethod
+    def from_ints(values: 'Sequence[int] | np.ndarray') -> 'ColorArray':
+        """Decode integer colors, same as Color(int): values below 0x1000000 are opaque RGB.
+
+        Args:
+            values (Sequence[int] | np.ndarray): Integer colors.
+
+        Returns:
+            ColorArray: Decoded colors.
+        """
+        import numpy as np
+        values = np.asarray(values, dtype=np.int64).reshape(-1)
+        alpha = np.where(values >= 16777216, values >> 24 & 0xFF, 255)
+        return ColorArray(np.stack([alpha, values >> 16 & 0xFF, values >> 8 & 0xFF, values & 0xFF], axis=-1))
+
+    @staticmethod
+    def from_hex(strings: Sequence[str]) -> 'ColorArray':
+        """Decode hexadecimal color strings, same as Color(str).
+
+        Args:
+            strings (Sequence[str]): Strings like '#RRGGBB' or '#AARRGGBB', '#' is optional.
+
+        Returns:
+            ColorArray: Decoded colors.
+        """
+        import numpy as np
+        digits = [string[1:] if string[:1] == '#' else string for string in strings]
+        if any(len(string) not in (6, 8) for string in digits):
+            raise ValueError("Color format error")
+        values = np.array([int(string, 16) for string in digits], dtype=np.int64)
+        opaque = np.array([len(string) == 6 for string in digits], dtype=bool)
+        return ColorArray(np.stack([np.where(opaque, 255, values >> 24 & 0xFF), values >> 16 & 0xFF,
+                                    values >> 8 & 0xFF, values & 0xFF], axis=-1).reshape(-1, 4))
+
+    @staticmethod
+    def gradient(stops: 'ColorArray | Sequence[Color | Tuple[int, ...] | int | str]',
+                 p: 'int | Sequence[float] | np.ndarray',
+                 positions: 'Sequence[float] | np.ndarray | None' = None,
+                 space: str = 'rgb'
+                 ) -> 'ColorArray':
+        """Sample a multi-stop gradient in one vectorized pass.
+
+        Args:
+            stops (ColorArray | Sequence): Gradient stop colors, at least one.
+            p (int | Sequence[float] | np.ndarray): Interpolation coefficients in the range [0, 1],
+                or the number of evenly spaced samples.
+            positions (Sequence[float] | np.ndarray | None): Increasing stop positions in [0, 1]. Defaults to evenly spaced.
+            space (str): 'rgb' (truncates like Color.gradient_interpolation_rgba), 'hsv' (hue takes the shorter way round)
+                or 'oklab' (perceptually uniform).
+
+        Returns:
+            ColorArray: Interpolated colors, one per coefficient.
+        """
+        import numpy as np
+        stops = ColorArray(stops)
+        if len(stops) == 0:
+            raise ValueError("A gradient needs at least one stop")
+        p = np.linspace(0, 1, p) if isinstance(p, int) else np.asarray(p, dtype=np.float64).reshape(-1)
+        positions = np.linspace(0, 1, len(stops)) if positions is None else np.asarray(positions, dtype=np.float64)
+        if len(positions) != len(stops):
+            raise ValueError("positions must match the number of stops")
+        if len(stops) == 1:
+            return ColorArray(np.repeat(stops.argb, len(p), axis=0))
+
+        # Segment of every coefficient and the progress inside it
+        index = np.clip(np.searchsorted(positions, p, side='right') - 1, 0, len(stops) - 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            local = np.clip((p - positions[index]) / (positions[index + 1] - positions[index]), 0, 1)
+        local = np.nan_to_num(local)[:, None]
+
+        argb = stops.argb.astype(np.float64)
+        alpha = argb[index, :1] + (argb[index + 1, :1] - argb[index, :1]) * local
+        if space == 'rgb':
+            rgb = argb[index, 1:] + (argb[index + 1, 1:] - argb[index, 1:]) * local
+            return ColorArray(np.concatenate([alpha, rgb], axis=1))
+        if space == 'hsv':
+            hsv = _rgb_to_hsv(argb[:, 1:] / 255)
+            h0, h1 = hsv[index, 0].copy(), hsv[index + 1, 0].copy()
+            # Grays have no hue, take the hue of the other end
+            h0 = np.where(hsv[index, 1] == 0, h1, h0)
+            h1 = np.where(hsv[index + 1, 1] == 0, h0, h1)
+            mixed = hsv[index] + (hsv[index + 1] - hsv[index]) * local
+            mixed[:, 0] = (h0 + ((h1 - h0 + 0.5) % 1 - 0.5) * local[:, 0]) % 1
+            rgb = _hsv_to_rgb(mixed)
+        elif space == 'oklab':
+            lab = _rgb_to_oklab(argb[:, 1:] / 255)
+            rgb = _oklab_to_rgb(lab[index] + (lab[index + 1] - lab[index]) * local)
+        else:
+            raise ValueError(f"Unknown color space: {space}")
+        return ColorArray(np.concatenate([np.rint(alpha), np.rint(rgb * 255)], axis=1))
+
+    @property
+    def a(self) -> 'np.ndarray':
+        return self.argb[:, 0]
+
+    @property
+    def r(self) -> 'np.ndarray':
+        return self.argb[:, 1]
+
+    @property
+    def g(self) -> 'np.ndarray':
+        return self.argb[:, 2]
+
+    @property
+    def b(self) -> 'np.ndarray':
+        return self.argb[:, 3]
+
+    def get_int(self, alpha: bool = False) -> 'np.ndarray':
+        """Get the integer representation of every color.
+
+        Args:
+            alpha (bool, optional): Whether to include the alpha channel. Defaults to False.
+
+        Returns:
+            np.ndarray: Integer colors with shape (N,).
+        """
+        import numpy as np
+        argb = self.argb.astype(np.int64)
+        value = (argb[:, 1] << 16) + (argb[:, 2] << 8) + argb[:, 3]
+        return value + (argb[:, 0] << 24) if alpha else value
+
+    def get_hex(self, alpha: bool = True, hashtag: bool = True) -> List[str]:
+        """Get the hexadecimal representation of every color, same format as Color.get_hex.
+
+        Args:
+            alpha (bool, optional): Whether to include the alpha channel. Defaults to True.
+            hashtag (bool, optional): Whether to include '#' in the hexadecimal strings.
+
+        Returns:
+            List[str]: Hexadecimal strings.
+        """
+        import numpy as np
+        channels = self.argb if alpha else self.argb[:, 1:]
+        width = channels.shape[1] * 2
+        # Hex-encode the whole buffer once, then cut it into fixed-width strings
+        digits = np.frombuffer(np.ascontiguousarray(channels).tobytes().hex().encode(), dtype=np.uint8).reshape(-1, width)
+        if hashtag:
+            digits = np.concatenate([np.full((len(digits), 1), ord('#'), dtype=np.uint8), digits], axis=1)
+            width += 1
+        return np.ascontiguousarray(digits).view(f'S{width}').reshape(-1).astype(str).tolist()
+
+    def nearest(self, palette: 'ColorArray | Sequence[Color | Tuple[int, ...] | int | str]', space: str = 'oklab',
+                chunk_size: int = 65536) -> 'np.ndarray':
+        """Find the closest palette entry for every color, ignoring alpha.
+
+        Args:
+            palette (ColorArray | Sequence): Palette colors.
+            space (str): 'rgb' for Euclidean RGB distance or 'oklab' for perceptual distance.
+            chunk_size (int): Colors compared per step, bounds the (chunk, palette) distance matrix.
+
+        Returns:
+            np.ndarray: Palette indices with shape (N,).
+        """
+        import numpy as np
+        palette = ColorArray(palette)
+        if space == 'rgb':
+            colors, targets = self.argb[:, 1:].astype(np.float64), palette.argb[:, 1:].astype(np.float64)
+        elif space == 'oklab':
+            colors, targets = _rgb_to_oklab(self.argb[:, 1:] / 255), _rgb_to_oklab(palette.argb[:, 1:] / 255)
+        else:
+            raise ValueError(f"Unknown color space: {space}")
+        # |c - t|^2 = |c|^2 - 2c.t + |t|^2, the first term is the same for every palette entry
+        target_norm = (targets ** 2).sum(axis=1)
+        index = np.empty(len(colors), dtype=np.int64)
+        for start in range(0, len(colors), chunk_size):
+            index[start:start + chunk_size] = (target_norm - 2 * colors[start:start + chunk_size] @ targets.T).argmin(axis=1)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.argb)
+
+    def __getitem__(self, index) -> 'Color | ColorArray':
+        import numpy as np
+        if isinstance(index, (int, np.integer)):
+            return Color(tuple(self.argb[index].tolist()))
+        return ColorArray(self.argb[index].reshape(-1, 4))
+
+    def __iter__(self) -> Iterator[Color]:
+        return (Color(argb) for argb in map(tuple, self.argb.tolist()))
+
+    def __str__(self) -> str:
+        """Return a string representation of the ColorArray object."""
+        return f'ColorArray({len(self)})'
+
+    def __add__(self, other: 'ColorArray | Color') -> 'ColorArray':
+        """Perform saturating addition, same as Color.__add__ for every color."""
+        import numpy as np
+        other = other.argb if isinstance(other, ColorArray) else np.array(other.argb)
+        return ColorArray(np.minimum(self.argb.astype(np.int16) + other, 255))
+
+    def __sub__(self, other: 'ColorArray | Color') -> 'ColorArray':
+        """Perform saturating subtraction, same as Color.__sub__ for every color."""
+        import numpy as np
+        other = other.argb if isinstance(other, ColorArray) else np.array(other.argb)
+        return ColorArray(np.maximum(self.argb.astype(np.int16) - other, 0))
+
+
 class CColor:
     # Constants Color
     WHITE = Color("#FFFFFF")
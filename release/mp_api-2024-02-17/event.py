@@ -1,8 +1,13 @@
-from typing import List, Union
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple, Union
 
+from . import config
 from .particle import BaseParticle
+from .sink import BufferedFileSink
 from .mp_typing import T_Pos, T_Vec3, T_Num
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class BaseEvent(object):
     def __init__(self, time: int = 0):
@@ -27,10 +32,40 @@ class BaseEvent(object):
         return "say BaseEvent"
 
 
+_NO_POS = ('~', '~', '~')
+_NO_DELTA = (0, 0, 0)
+
+
+def _vec3_text(values: T_Pos | T_Vec3) -> str:
+    """Format the first three values of a position or delta, floats limited to 5 decimal places.
+
+    Args:
+        values (T_Pos | T_Vec3): The values to format.
+
+    Returns:
+        str: The values separated by spaces.
+    """
+    if values is _NO_POS:
+        return '~ ~ ~'
+    if values is _NO_DELTA:
+        return '0 0 0'
+    x, y, z = values[0], values[1], values[2]
+    if type(x) is float and type(y) is float and type(z) is float:
+        return '%.5f %.5f %.5f' % (x, y, z)
+    return ' '.join([f'{p:.5f}' if isinstance(p, float) else str(p) for p in (x, y, z)])
+
+
+def _vec3_tuple(values: T_Pos | T_Vec3) -> tuple:
+    return tuple([f'{p:.5f}' if isinstance(p, float) else p for p in values])
+
+
 class ExecuteEvent(BaseEvent):
     def __init__(self, sub_commands: List[str], run_event: BaseEvent, **kwargs):
         """Initialize an ExecuteEvent.
 
+        The 'execute ... run ' prefix is built once, assign a new list to sub_commands
+        instead of editing it in place.
+
         Args:
             sub_commands (List[str]): List of sub-commands for execution.
             run_event (BaseEvent): The event to run.
@@ -40,6 +75,16 @@ class ExecuteEvent(BaseEvent):
         self.sub_commands = sub_commands
         self.run_event = run_event
 
+    @property
+    def sub_commands(self) -> List[str]:
+        """Get the sub-commands for execution."""
+        return self._sub_commands
+
+    @sub_commands.setter
+    def sub_commands(self, sub_commands: List[str]):
+        self._sub_commands = sub_commands
+        self._prefix = f"execute {' '.join(sub_commands)} run "
+
     @property
     def command(self) -> str:
         """Get the command associated with the ExecuteEvent.
@@ -47,7 +92,7 @@ class ExecuteEvent(BaseEvent):
         Returns:
             str: The command string.
         """
-        return f"execute {' '.join(self.sub_commands)} run {self.run_event.command}"
+        return self._prefix + self.run_event.command
 
 
 class FillEvent(BaseEvent):
@@ -100,7 +145,7 @@ class FunctionEvent(BaseEvent):
 
 
 class ParticleEvent(BaseEvent):
-    def __init__(self, particle: BaseParticle, pos: T_Pos = ('~', '~', '~'), delta: T_Vec3 = (0, 0, 0),
+    def __init__(self, particle: BaseParticle, pos: T_Pos = _NO_POS, delta: T_Vec3 = _NO_DELTA,
                  speed: T_Num = 0, count: int = 1, force: str = 'force', player: str = '@a', **kwargs):
         """Initialize a ParticleEvent.
 
@@ -116,32 +161,192 @@ class ParticleEvent(BaseEvent):
         """
         super().__init__(**kwargs)
         self.particle = particle
-        self.pos = pos
-        self.delta = delta
+        # Same as the pos and delta setters, without the property calls
+        self._pos, self._pos_text, self._pos_tuple = pos, _vec3_text(pos), None
+        self._delta, self._delta_text, self._delta_tuple = delta, _vec3_text(delta), None
         self.speed = speed
         self.count = count
         self.force = force
         self.player = player
-        # Limit decimal places for pos and delta
-        self.pos = tuple([f'{p:.5f}' if isinstance(p, float) else p for p in self.pos])
-        self.delta = tuple([f'{p:.5f}' if isinstance(p, float) else p for p in self.delta])
 
     def __str__(self) -> str:
         """Return a string representation of the ParticleEvent."""
         return "<ParticleEvent>"
 
+    # pos and delta are formatted into command text once when assigned, the getters
+    # build the old tuples with floats limited to 5 decimal places on first read
+    @property
+    def pos(self) -> T_Pos:
+        """Get the position, floats formatted to 5 decimal places."""
+        if self._pos_tuple is None:
+            self._pos_tuple = _vec3_tuple(self._pos)
+        return self._pos_tuple
+
+    @pos.setter
+    def pos(self, pos: T_Pos):
+        self._pos, self._pos_text, self._pos_tuple = pos, _vec3_text(pos), None
+
+    @property
+    def delta(self) -> T_Vec3:
+        """Get the delta, floats formatted to 5 decimal places."""
+        if self._delta_tuple is None:
+            self._delta_tuple = _vec3_tuple(self._delta)
+        return self._delta_tuple
+
+    @delta.setter
+    def delta(self, delta: T_Vec3):
+        self._delta, self._delta_text, self._delta_tuple = delta, _vec3_text(delta), None
+
     @property
     def command(self) -> str:
         """Get the command associated with the ParticleEvent.
 
+        The position and delta text is formatted when they are assigned, the particle
+        descriptor is cached by the particle.
+
         Returns:
             str: The command string.
         """
-        return f"particle {self.particle.name} {self.pos[0]} {self.pos[1]} {self.pos[2]} " \
-               f"{self.delta[0]} {self.delta[1]} {self.delta[2]} {self.speed} {self.count} " \
+        return f"particle {self.particle.name} {self._pos_text} {self._delta_text} {self.speed} {self.count} " \
                f"{self.force} {self.player}"
 
 
+class ParticleEventBatch(BaseEvent):
+    def __init__(self, particle: 'BaseParticle | List[str]', pos: 'np.ndarray', delta: 'np.ndarray | T_Vec3' = (0, 0, 0),
+                 speed: 'np.ndarray | T_Num' = 0, count: 'np.ndarray | int' = 1, force: str = 'force',
+                 player: str = '@a', relative: bool = False, **kwargs):
+        """Initialize a ParticleEventBatch, many particle commands sharing one particle.
+
+        Per-event values are stored as NumPy columns and formatted in bulk, scalar values
+        are baked into the command template once.
+
+        Args:
+            particle (BaseParticle | List[str]): The particle shared by all events, or one particle
+                descriptor per event, e.g. from BestParticle.render_names.
+            pos (np.ndarray): Positions with shape (N, 3).
+            delta (np.ndarray | T_Vec3, optional): Deltas with shape (N, 3) or one shared delta.
+            speed (np.ndarray | T_Num, optional): Speeds with shape (N,) or one shared speed.
+            count (np.ndarray | int, optional): Counts with shape (N,) or one shared count.
+            force (str, optional): Force mode ('force' by default).
+            player (str, optional): Target player ('@a' by default).
+            relative (bool, optional): Prefix positions with '~' (False by default).
+            **kwargs: Additional keyword arguments.
+        """
+        import numpy as np
+        super().__init__(**kwargs)
+        self.particle = particle
+        self.pos = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+        self.delta = tuple(delta) if np.ndim(delta) == 1 else np.asarray(delta, dtype=np.float64).reshape(-1, 3)
+        self.speed = speed if np.isscalar(speed) else np.asarray(speed, dtype=np.float64).reshape(-1)
+        self.count = count if np.isscalar(count) else np.asarray(count, dtype=np.int64).reshape(-1)
+        self.force = force
+        self.player = player
+        self.relative = relative
+        if not isinstance(particle, BaseParticle) and len(particle) != len(self.pos):
+            raise ValueError(f'particle has {len(particle)} descriptors, expected {len(self.pos)}')
+        for name in ('delta', 'speed', 'count'):
+            value = getattr(self, name)
+            if isinstance(value, np.ndarray) and len(value) != len(self.pos):
+                raise ValueError(f'{name} has {len(value)} rows, expected {len(self.pos)}')
+
+    def __len__(self) -> int:
+        """Return the number of events in the batch."""
+        return len(self.pos)
+
+    def select(self, index: 'np.ndarray') -> 'ParticleEventBatch':
+        """Create a batch with a subset of the events.
+
+        Args:
+            index (np.ndarray): Row indices or a boolean mask of the events to keep.
+
+        Returns:
+            ParticleEventBatch: The new batch, sharing the particle and scalar values.
+        """
+        import numpy as np
+        columns = {name: value[index] if isinstance(value, np.ndarray) else value
+                   for name, value in (('delta', self.delta), ('speed', self.speed), ('count', self.count))}
+        particle = self.particle
+        if not isinstance(particle, BaseParticle):
+            particle = np.asarray(particle, dtype=object)[index].tolist()
+        return ParticleEventBatch(particle, self.pos[index], force=self.force, player=self.player,
+                                  relative=self.relative, time=self.time, **columns)
+
+    def __str__(self) -> str:
+        """Return a string representation of the ParticleEventBatch."""
+        return f"<ParticleEventBatch {len(self)}>"
+
+    def _template(self) -> Tuple[str, 'np.ndarray']:
+        """Build the printf-style line template and the matching value columns.
+
+        Returns:
+            Tuple[str, np.ndarray]: The template and a float array with one row per event.
+        """
+        import numpy as np
+        p = '~' if self.relative else ''
+        fields = [f'{p}%.5f {p}%.5f {p}%.5f']
+        columns = [self.pos]
+        if isinstance(self.delta, np.ndarray):
+            fields.append('%.5f %.5f %.5f')
+            columns.append(self.delta)
+        else:
+            fields.append(' '.join([f'{d:.5f}' if isinstance(d, float) else str(d) for d in self.delta]))
+        if isinstance(self.speed, np.ndarray):
+            fields.append('%.5f')
+            columns.append(self.speed[:, None])
+        else:
+            fields.append(str(self.speed))
+        if isinstance(self.count, np.ndarray):
+            fields.append('%d')
+            columns.append(self.count[:, None])
+        else:
+            fields.append(str(self.count))
+        # 粒子名中的表达式可能含有%，逐事件的粒子名作为%s列填入
+        name = self.particle.name.replace('%', '%%') if isinstance(self.particle, BaseParticle) else '%s'
+        template = f"particle {name} {' '.join(fields)} {self.force} {self.player}"
+        return template, np.hstack(columns)
+
+    def iter_commands(self, chunk_size: int = config.stream_buffer_size) -> Iterator[List[str]]:
+        """Generate the commands of the batch in chunks.
+
+        Args:
+            chunk_size (int, optional): Number of commands per chunk.
+
+        Yields:
+            List[str]: The command strings of one chunk.
+        """
+        template, values = self._template()
+        names = None if isinstance(self.particle, BaseParticle) else list(self.particle)
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i + chunk_size]
+            if names is None:
+                flat = tuple(chunk.ravel().tolist())
+            else:
+                flat = tuple([v for name, row in zip(names[i:i + chunk_size], chunk.tolist()) for v in (name, *row)])
+            # 一次%运算格式化整块，避免逐个事件拼接字符串
+            yield ('\n'.join([template] * len(chunk)) % flat).split('\n')
+
+    @property
+    def commands(self) -> List[str]:
+        """Get all commands of the ParticleEventBatch.
+
+        Returns:
+            List[str]: The command strings.
+        """
+        commands = []
+        for chunk in self.iter_commands():
+            commands.extend(chunk)
+        return commands
+
+    @property
+    def command(self) -> str:
+        """Get all commands of the ParticleEventBatch joined by newlines.
+
+        Returns:
+            str: The command string.
+        """
+        return '\n'.join(self.commands)
+
+
 class ScheduleEvent(BaseEvent):
     def __init__(self, function: Union['MCFunction', str], time: int, unit: str = 't',
                  clear: bool = False, append: str = ''):
@@ -174,7 +379,8 @@ class ScheduleEvent(BaseEvent):
         if self.clear:
             return f"schedule clear {function_name}"
         else:
-            return f"schedule function {function_name} {self.time}{self.unit} {self.append}"
+            command = f"schedule function {function_name} {self.time}{self.unit}"
+            return f"{command} {self.append}" if self.append else command
 
 
 class SetBlockEvent(BaseEvent):
@@ -203,18 +409,97 @@ class SetBlockEvent(BaseEvent):
 
 
 class MCFunction(object):
-    def __init__(self, name: str, commands: List[str] = None, namespace: str = None):
+    def __init__(self, name: str, commands: List[str] = None, namespace: str = None, stream: bool = False,
+                 dedup: bool = False, dedup_window: int = config.dedup_window):
         """Initialize an MCFunction.
 
         Args:
             name (str): The name of the function.
             commands (List[str], optional): List of commands within the function (None by default).
             namespace (str, optional): The namespace of the function (None by default).
+            stream (bool, optional): Stream commands to the target file instead of keeping them
+                in memory. Commands added before a sink is opened are kept until then (False by default).
+            dedup (bool, optional): Merge added particle commands that only differ in count into one
+                command with the summed count, exact duplicates included, so no particle is lost.
+                Only particle commands are merged: duplicate non-particle commands are always kept,
+                since repeating one can matter (scoreboard players add, function, say, or a setblock
+                that undoes a command in between), and particle commands are not moved past them.
+                Particle commands with count 0 are kept as they are (False by default).
+            dedup_window (int, optional): Number of distinct particle commands held for merging before
+                they are written, so memory stays bounded when streaming.
         """
+        if dedup_window <= 0:
+            raise ValueError(f'Dedup window must be positive, got {dedup_window}')
         self.name = name
         self.namespace = namespace
-        if commands is None:
-            self.commands = []
+        self._commands = commands if commands is not None else []
+        self.stream = stream
+        self.sink: BufferedFileSink | None = None
+        self.dedup = dedup
+        self.dedup_window = dedup_window
+        self.saved_commands = 0
+        # (particle command before the count, force and player) -> summed count, in first seen order
+        self._pending: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def commands(self) -> List[str]:
+        """Get the commands kept in memory, pending merged particle commands are written first.
+
+        Returns:
+            List[str]: The commands.
+        """
+        if self._pending:
+            self.flush()
+        return self._commands
+
+    @commands.setter
+    def commands(self, commands: List[str]):
+        self._commands = commands
+
+    @property
+    def command_count(self) -> int:
+        """Get the number of commands added to the MCFunction, including streamed ones.
+
+        Returns:
+            int: The number of commands.
+        """
+        return len(self.commands) + (self.sink.line_count if self.sink is not None else 0)
+
+    def open_sink(self, path: str, buffer_size: int = config.stream_buffer_size):
+        """Open a buffered file sink for a streaming MCFunction.
+
+        Pending commands are moved into the sink, later commands are flushed to `path`
+        in chunks of `buffer_size` lines.
+
+        Args:
+            path (str): The .mcfunction file to write.
+            buffer_size (int, optional): Number of lines buffered before flushing.
+        """
+        if not self.stream:
+            raise ValueError(f'MCFunction {self.name} is not in stream mode')
+        if self.sink is not None:
+            raise ValueError(f'MCFunction {self.name} already has a sink')
+        self.sink = BufferedFileSink(path, buffer_size)
+        self.sink.write(*self.commands)
+        self.commands = []
+
+    def close(self, old_digest: str | None = None) -> bool:
+        """Flush and close the sink of a streaming MCFunction.
+
+        Args:
+            old_digest (str | None, optional): Digest from the last export, an identical file is not replaced.
+
+        Returns:
+            bool: Whether the file was replaced.
+        """
+        if self.sink is not None:
+            self.flush()
+            return self.sink.close(old_digest)
+        return False
+
+    def flush(self):
+        """Write the pending merged particle commands."""
+        self._write(self._take_pending())
 
     def add_command(self, command: str):
         """Add a command to the MCFunction.
@@ -222,15 +507,70 @@ class MCFunction(object):
         Args:
             command (str): The command to add.
         """
-        self.commands.append(command)
+        if self.dedup:
+            self._extend([command])
+        elif self.sink is not None:
+            self.sink.write(command)
+        else:
+            self._commands.append(command)
+
+    def _take_pending(self) -> List[str]:
+        merged = [f'{head} {count} {tail}' for (head, tail), count in self._pending.items()]
+        self._pending.clear()
+        return merged
+
+    def _merge(self, commands: List[str]) -> List[str]:
+        """Sum the counts of particle commands into the pending ones, return the commands to write now."""
+        pending = self._pending
+        out = []
+        for command in commands:
+            if not command.startswith('particle '):
+                # Particles are not moved past other commands
+                if pending:
+                    out.extend(self._take_pending())
+                out.append(command)
+                continue
+            parts = command.rsplit(' ', 3)
+            # A count of 0 gives the delta another meaning, such particles are never merged
+            if len(parts) != 4 or parts[2] not in ('force', 'normal') or not parts[1].isdigit() or parts[1] == '0':
+                out.append(command)
+                continue
+            head, count, force, player = parts
+            key = (head, f'{force} {player}')
+            self.saved_commands += key in pending
+            pending[key] = pending.get(key, 0) + int(count)
+            if len(pending) >= self.dedup_window:
+                out.extend(self._take_pending())
+        return out
+
+    def _write(self, commands: List[str]):
+        if self.sink is not None:
+            self.sink.write(*commands)
+        else:
+            self._commands.extend(commands)
+
+    def _extend(self, commands: List[str]):
+        if self.dedup:
+            commands = self._merge(commands)
+        self._write(commands)
 
     def add_events(self, *events: BaseEvent):
         """Add a list of events to the MCFunction.
 
         Args:
-            *events (BaseEvent): Variable number of events to add.
+            *events (BaseEvent): Variable number of events to add, ParticleEventBatch is expanded
+                chunk by chunk.
         """
-        self.commands.extend([e.command for e in events])
+        commands = []
+        for e in events:
+            if isinstance(e, ParticleEventBatch):
+                self._extend(commands)
+                commands = []
+                for chunk in e.iter_commands():
+                    self._extend(chunk)
+            else:
+                commands.append(e.command)
+        self._extend(commands)
 
     def __str__(self) -> str:
         """Return a string representation of the MCFunction."""
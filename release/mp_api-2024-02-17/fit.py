@@ -0,0 +1,255 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from .mp_typing import T_Color, T_Num
+from .particle import BestParticle
+from .utils import TraceExp, mp_if, mp_sin, round_constant
+
+# Significant digits of the constants written into expressions
+_digits = 6
+
+
+def _round(value: float) -> float:
+    if not value or not math.isfinite(value):
+        return float(value) + 0.0
+    # Significant digits as decimals relative to the magnitude of the value
+    return float(round_constant(value, _digits - 1 - math.floor(math.log10(abs(value)))))
+
+
+def _variable(var: str, t0: float) -> TraceExp:
+    t = TraceExp(var)
+    return t - t0 if t0 else t
+
+
+def _poly_exp(coefficients: List[float], u: TraceExp) -> TraceExp | float:
+    """Write a polynomial in Horner form, coefficients from the constant term up, zero terms skipped."""
+    result = 0.0
+    for c in reversed(coefficients):
+        if isinstance(result, TraceExp) or result:
+            result = u if result == 1 and not isinstance(result, TraceExp) else result * u
+        if c:
+            if not isinstance(result, TraceExp):
+                result = c
+            else:
+                result = result + c if c > 0 else result - (-c)
+    return result
+
+
+def _negligible(value: float, scale: float, tolerance: float) -> bool:
+    # Terms changing the result by less than a thousandth of the tolerance are dropped
+    return abs(value) * scale < tolerance * 1e-3
+
+
+def _fit_poly(t: np.ndarray, y: np.ndarray, degree: int, t0: float, tolerance: float) -> Tuple[List[float], np.ndarray]:
+    """Least squares polynomial in t - t0 with rounded coefficients, negligible terms dropped.
+
+    Returns:
+        Tuple[List[float], np.ndarray]: The coefficients from the constant term up and the fitted values.
+    """
+    u = t - _round(t0)
+    degree = min(degree, len(t) - 1)
+    coefficients = np.polynomial.polynomial.polyfit(u, y, degree) if degree > 0 else np.array([y.mean()])
+    scale = float(np.abs(u).max()) if len(u) else 0.0
+    coefficients = [0.0 if _negligible(c, scale ** k, tolerance) else _round(c) for k, c in enumerate(coefficients.tolist())]
+    return coefficients, np.polynomial.polynomial.polyval(u, coefficients)
+
+
+def _poly_candidate(t: np.ndarray, y: np.ndarray, max_degree: int, tolerance: float, var: str) -> Tuple[str, float] | None:
+    """The lowest degree polynomial within tolerance, or None."""
+    for degree in range(max_degree + 1):
+        coefficients, fitted = _fit_poly(t, y, degree, t[0], tolerance)
+        error = float(np.abs(fitted - y).max())
+        if error <= tolerance:
+            return str(_poly_exp(coefficients, _variable(var, _round(t[0])))), error
+    return None
+
+
+def _sin_design(u: np.ndarray, omega: float, harmonics: int) -> np.ndarray:
+    columns = [np.ones_like(u), u]
+    for k in range(1, harmonics + 1):
+        columns += [np.sin(k * omega * u), np.cos(k * omega * u)]
+    return np.stack(columns, axis=-1)
+
+
+def _sin_residual(u: np.ndarray, y: np.ndarray, omega: float, harmonics: int) -> float:
+    design = _sin_design(u, omega, harmonics)
+    solution = np.linalg.lstsq(design, y, rcond=None)[0]
+    return float(np.sum((design @ solution - y) ** 2))
+
+
+def _sin_candidate(t: np.ndarray, y: np.ndarray, harmonics: int, tolerance: float, var: str,
+                   frequencies: int = 256) -> Tuple[str, float]:
+    """Fit a + b*u + sum(r_k * sin(k*w*u + phi_k)) with u = t - t[0], the frequency found by a grid search.
+
+    Returns:
+        Tuple[str, float]: The expression and its max error.
+    """
+    u = t - _round(t[0])
+    span = float(u[-1]) if len(u) > 1 and u[-1] > 0 else 1.0
+    step = float(np.min(np.diff(u))) if len(u) > 1 else 1.0
+    # From a quarter period over the samples up to the Nyquist frequency
+    grid = np.geomspace(math.pi / (2 * span), math.pi / max(step, 1e-9), frequencies)
+    residuals = [_sin_residual(u, y, omega, harmonics) for omega in grid]
+    best = int(np.argmin(residuals))
+    low, high = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+    # Golden section search between the neighbours of the best grid frequency
+    ratio = (math.sqrt(5) - 1) / 2
+    for _ in range(40):
+        a, b = high - ratio * (high - low), low + ratio * (high - low)
+        if _sin_residual(u, y, a, harmonics) < _sin_residual(u, y, b, harmonics):
+            high = b
+        else:
+            low = a
+    omega = _round((low + high) / 2)
+    solution = np.linalg.lstsq(_sin_design(u, omega, harmonics), y, rcond=None)[0].tolist()
+
+    scale = float(np.abs(u).max())
+    a, b = [0.0 if _negligible(c, scale ** k, tolerance) else _round(c) for k, c in enumerate(solution[:2])]
+    fitted = a + b * u
+    expression = _poly_exp([a, b], _variable(var, _round(t[0])))
+    for k in range(harmonics):
+        s, c = solution[2 + 2 * k], solution[3 + 2 * k]
+        # s*sin(x) + c*cos(x) = r*sin(x + phi)
+        r, phi = _round(math.hypot(s, c)), _round(math.atan2(c, s))
+        frequency = _round((k + 1) * omega)
+        if _negligible(r, 1, tolerance):
+            continue
+        phi = 0.0 if _negligible(phi, r, tolerance) else phi
+        fitted = fitted + r * np.sin(frequency * u + phi)
+        angle = frequency * _variable(var, _round(t[0]))
+        term = mp_sin(angle + phi if phi > 0 else angle - (-phi) if phi else angle)
+        term = term if r == 1 else r * term
+        expression = expression + term if isinstance(expression, TraceExp) or expression else term
+    return str(expression), float(np.abs(fitted - y).max())
+
+
+def _piecewise_candidate(t: np.ndarray, y: np.ndarray, max_degree: int, max_pieces: int, tolerance: float,
+                         var: str) -> Tuple[str, float]:
+    """Split the samples greedily into the longest pieces a polynomial fits within tolerance, joined by mp_if.
+
+    Returns:
+        Tuple[str, float]: The expression and its max error, over tolerance if max_pieces are not enough.
+    """
+    def fits(start: int, end: int) -> bool:
+        return any(float(np.abs(_fit_poly(t[start:end], y[start:end], d, t[start], tolerance)[1] - y[start:end]).max()) <= tolerance
+                   for d in range(max_degree + 1))
+
+    bounds = [0]
+    while bounds[-1] < len(t) and len(bounds) <= max_pieces:
+        start = bounds[-1]
+        if len(bounds) == max_pieces:
+            end = len(t)
+        else:
+            # Grow the piece by doubling, then bisect its end
+            low, high = min(start + max_degree + 1, len(t)), min(start + 2 * (max_degree + 1), len(t))
+            while high < len(t) and fits(start, high):
+                low, high = high, min(start + 2 * (high - start), len(t))
+            if fits(start, high):
+                low = high
+            while high - low > 1:
+                middle = (low + high) // 2
+                if fits(start, middle):
+                    low = middle
+                else:
+                    high = middle
+            end = low
+        bounds.append(end)
+
+    pieces = []
+    fitted = np.empty_like(y)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        errors = []
+        for degree in range(max_degree + 1):
+            coefficients, values = _fit_poly(t[start:end], y[start:end], degree, t[start], tolerance)
+            errors.append((float(np.abs(values - y[start:end]).max()), degree, coefficients, values))
+            if errors[-1][0] <= tolerance:
+                break
+        error, _, coefficients, values = min(errors, key=lambda e: e[0])
+        fitted[start:end] = values
+        pieces.append(_poly_exp(coefficients, _variable(var, _round(t[start]))))
+
+    expression = pieces[-1]
+    for end, piece in zip(reversed(bounds[1:-1]), reversed(pieces[:-1])):
+        # Switch halfway between the last sample of a piece and the first of the next one
+        expression = mp_if(TraceExp(var) < _round((t[end - 1] + t[end]) / 2), piece, expression)
+    return str(expression), float(np.abs(fitted - y).max())
+
+
+def fit_expression(t: np.ndarray, values: np.ndarray, tolerance: T_Num = 0.05, max_degree: int = 3,
+                   max_harmonics: int = 2, max_pieces: int = 8, var: str = 't') -> Tuple[str, float]:
+    """Find a compact expression of var through sampled values.
+
+    Tries a constant and polynomials up to max_degree, a line plus up to max_harmonics harmonics of
+    one sine (mp_sin), and polynomial pieces joined with mp_if. The shortest expression within
+    tolerance wins, if none is, the one with the smallest error. Constants are rounded to 6
+    significant digits before the error is measured.
+
+    Args:
+        t (np.ndarray): Sample times with shape (T,), increasing.
+        values (np.ndarray): Values with shape (T,).
+        tolerance (T_Num, optional): Max absolute error (0.05 by default).
+        max_degree (int, optional): Max polynomial degree, also of every piece (3 by default).
+        max_harmonics (int, optional): Max number of harmonics of the sine basis (2 by default).
+        max_pieces (int, optional): Max number of pieces (8 by default).
+        var (str, optional): Variable of the expression ('t' by default).
+
+    Returns:
+        Tuple[str, float]: The expression and its max absolute error on the samples.
+    """
+    t = np.asarray(t, dtype=np.float64).reshape(-1)
+    y = np.asarray(values, dtype=np.float64).reshape(-1)
+    if len(t) != len(y) or not len(t):
+        raise ValueError(f'Expected the same non-zero number of times and values, got {len(t)} and {len(y)}')
+    if len(t) > 1 and np.any(np.diff(t) <= 0):
+        raise ValueError('Sample times must be increasing')
+
+    candidate = _poly_candidate(t, y, max_degree, tolerance, var)
+    candidates = [candidate] if candidate is not None else []
+    if candidate is None or len(candidate[0]) > 24:
+        for harmonics in range(1, max_harmonics + 1):
+            if len(t) >= 2 * harmonics + 3:
+                candidates.append(_sin_candidate(t, y, harmonics, tolerance, var))
+        candidates.append(_piecewise_candidate(t, y, max_degree, max_pieces, tolerance, var))
+    passing = [c for c in candidates if c[1] <= tolerance]
+    if passing:
+        return min(passing, key=lambda c: len(c[0]))
+    return min(candidates, key=lambda c: c[1])
+
+
+def fit_best_particle(points: np.ndarray, t: np.ndarray = None, tolerance: T_Num = 0.05, origin=None,
+                      life: int = None, rand: int = 1, color: T_Color = 'white', **kwargs) -> BestParticle:
+    """Fit a BestParticle whose expressions follow sampled points, the motion is computed by the client.
+
+    The expressions give the offset from origin as a function of the particle age t, the age
+    being 0 at the first sample. Spawn the particle at origin at the time of the first sample.
+
+    Args:
+        points (np.ndarray): Positions with shape (T, 3).
+        t (np.ndarray, optional): Sample times with shape (T,), one sample per tick by default.
+        tolerance (T_Num, optional): Max absolute error per axis (0.05 by default).
+        origin (optional): Spawn position, the first point by default.
+        life (int, optional): Life of the particle, up to the last sample by default.
+        rand (int, optional): Rand of the particle (1 by default).
+        color (T_Color, optional): Color of the particle ('white' by default).
+        **kwargs: Other arguments of fit_expression.
+
+    Returns:
+        BestParticle: The particle.
+
+    Raises:
+        ValueError: If an axis cannot be fitted within tolerance.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    t = np.arange(len(points), dtype=np.float64) if t is None else np.asarray(t, dtype=np.float64).reshape(-1)
+    age = t - t[0]
+    offsets = points - (points[0] if origin is None else np.asarray(origin, dtype=np.float64))
+    expressions = []
+    for axis in range(3):
+        expression, error = fit_expression(age, offsets[:, axis], tolerance, **kwargs)
+        if error > tolerance:
+            raise ValueError(f'Axis {"xyz"[axis]} fitted with error {error:.4g}, over tolerance {tolerance}')
+        expressions.append(expression)
+    life = life if life is not None else int(math.ceil(age[-1])) + 1
+    return BestParticle(*expressions, life=life, rand=rand, color=color)
@@ -1,5 +1,6 @@
 import math
-from typing import List
+from collections.abc import Sequence
+from typing import List, Tuple
 
 import numpy as np
 from .mp_typing import T_Num
@@ -23,6 +24,8 @@ class Note:
 
 
 class Point2:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         """
         Initialize a 2D point.
@@ -63,6 +66,8 @@ class Point2:
 
 
 class Point3:
+    __slots__ = ('x', 'y', 'z', 't')
+
     def __init__(self, x, y, z, t=0):
         """
         Initialize a 3D point.
@@ -75,7 +80,99 @@ class Point3:
         self.x = x
         self.y = y
         self.z = z
-        self.t = 0
+        self.t = t
+
+    @property
+    def point2mc(self):
+        """
+        Convert the 3D point to a 2D point (ignoring the y-coordinate).
+
+        Returns:
+            Point2: 2D point representation of the 3D point.
+        """
+        return Point2(self.x, self.z)
+
+    def get_distance(self, point: 'Point3') -> T_Num:
+        """
+        Get the Euclidean distance between two points.
+
+        Args:
+            point: Another Point3 object.
+
+        Returns:
+            T_Num: Euclidean distance between the points.
+        """
+        return ((self.x - point.x) ** 2 + (self.y - point.y) ** 2 + (self.z - point.z) ** 2) ** 0.5
+
+    def __str__(self):
+        return f"Point3({self.x}, {self.y}, {self.z})"
+
+
+class Point3List(Sequence):
+    def __init__(self, array: np.ndarray):
+        """
+        Initialize a lazy Point3 view over an (N, 3) coordinate array.
+
+        Point3 objects are only created when items are accessed.
+
+        Args:
+            array: Coordinates with shape (N, 3).
+        """
+        self.array = np.asarray(array, dtype=np.float64).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Point3List(self.array[index])
+        x, y, z = self.array[index].tolist()
+        return Point3(x, y, z)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+    def __str__(self):
+        return f"Point3List({len(self)})"
+
+
+class Point3View:
+    __slots__ = ('cloud', 'index')
+
+    def __init__(self, cloud: 'PointCloud3', index: int):
+        """
+        Initialize a view of one point in a PointCloud3. Reads and writes go to the cloud's array.
+
+        Args:
+            cloud: The PointCloud3 holding the coordinates.
+            index: Row index of the point.
+        """
+        self.cloud = cloud
+        self.index = index
+
+    @property
+    def x(self):
+        return self.cloud.array[self.index, 0]
+
+    @x.setter
+    def x(self, value):
+        self.cloud.array[self.index, 0] = value
+
+    @property
+    def y(self):
+        return self.cloud.array[self.index, 1]
+
+    @y.setter
+    def y(self, value):
+        self.cloud.array[self.index, 1] = value
+
+    @property
+    def z(self):
+        return self.cloud.array[self.index, 2]
+
+    @z.setter
+    def z(self, value):
+        self.cloud.array[self.index, 2] = value
 
     @property
     def point2mc(self):
@@ -103,6 +200,104 @@ class Point3:
         return f"Point3({self.x}, {self.y}, {self.z})"
 
 
+class PointCloud3(Point3List):
+    def __init__(self, array: np.ndarray):
+        """
+        Initialize a point cloud stored in one contiguous (N, 3) float64 array.
+
+        Items are Point3View objects sharing the array, bulk operations return new clouds.
+
+        Args:
+            array: Coordinates with shape (N, 3), or anything convertible to it.
+        """
+        super().__init__(np.ascontiguousarray(np.asarray(array, dtype=np.float64).reshape(-1, 3)))
+
+    @staticmethod
+    def from_points(points: List[Point3]) -> 'PointCloud3':
+        """
+        Build a PointCloud3 from Point3-like objects.
+
+        Args:
+            points: Objects with x, y and z attributes.
+
+        Returns:
+            PointCloud3: The point cloud.
+        """
+        return PointCloud3(np.array([(p.x, p.y, p.z) for p in points], dtype=np.float64))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointCloud3(self.array[index])
+        return Point3View(self, range(len(self))[index])
+
+    def translate(self, offset: Tuple[T_Num, T_Num, T_Num]) -> 'PointCloud3':
+        """
+        Move all points by an offset.
+
+        Args:
+            offset: (dx, dy, dz).
+
+        Returns:
+            PointCloud3: The translated cloud.
+        """
+        return PointCloud3(self.array + np.asarray(offset, dtype=np.float64))
+
+    def scale(self, factor: T_Num | Tuple[T_Num, T_Num, T_Num], origin: Tuple[T_Num, T_Num, T_Num] = (0, 0, 0)) -> 'PointCloud3':
+        """
+        Scale all points around an origin.
+
+        Args:
+            factor: Uniform factor or per-axis factors.
+            origin: Center of scaling.
+
+        Returns:
+            PointCloud3: The scaled cloud.
+        """
+        origin = np.asarray(origin, dtype=np.float64)
+        return PointCloud3((self.array - origin) * np.asarray(factor, dtype=np.float64) + origin)
+
+    def rotate(self, angle: T_Num, axis: str | Tuple[T_Num, T_Num, T_Num] = 'y', origin: Tuple[T_Num, T_Num, T_Num] = (0, 0, 0)) -> 'PointCloud3':
+        """
+        Rotate all points around an axis through an origin, counterclockwise by the right-hand rule.
+
+        Args:
+            angle: Rotation angle in radians.
+            axis: 'x', 'y', 'z' or a direction vector.
+            origin: A point on the rotation axis.
+
+        Returns:
+            PointCloud3: The rotated cloud.
+        """
+        if isinstance(axis, str):
+            axis = {'x': (1, 0, 0), 'y': (0, 1, 0), 'z': (0, 0, 1)}[axis]
+        k = np.asarray(axis, dtype=np.float64)
+        k = k / np.linalg.norm(k)
+        # Rodrigues' rotation formula
+        cross = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+        matrix = np.eye(3) + math.sin(angle) * cross + (1 - math.cos(angle)) * cross @ cross
+        origin = np.asarray(origin, dtype=np.float64)
+        return PointCloud3((self.array - origin) @ matrix.T + origin)
+
+    def distance(self, other: 'Point3 | PointCloud3 | Tuple[T_Num, T_Num, T_Num]') -> np.ndarray:
+        """
+        Get the Euclidean distances to a point, or row by row to another cloud of the same size.
+
+        Args:
+            other: A Point3-like object, an (x, y, z) tuple or a PointCloud3.
+
+        Returns:
+            np.ndarray: Distances with shape (N,).
+        """
+        if isinstance(other, Point3List):
+            other = other.array
+        elif hasattr(other, 'x'):
+            other = (other.x, other.y, other.z)
+        return np.linalg.norm(self.array - np.asarray(other, dtype=np.float64), axis=-1)
+
+    def __str__(self):
+        return f"PointCloud3({len(self)})"
+
+
 class Line2:
     def __init__(self, a, b, c):
         """
@@ -271,6 +466,8 @@ class Arc2:
         """
         Initialize a 2D arc.
 
+        The start angle and the angular difference are computed once here, the arc should not be mutated afterwards.
+
         Args:
             center: Center Point2 of the arc. If None, the arc is a straight line.
             start: Start Point2 of the arc.
@@ -285,25 +482,18 @@ class Arc2:
         # Ensure positive/negative direction
         if self.direction != 0:
             self.direction = self.direction / abs(self.direction)
+        if center is not None:
+            v1 = center.get_vector2(start)
+            v2 = center.get_vector2(end)
+            self.start_angle = math.atan2(v1.y, v1.x)
+            self.delta_angle = Arc2._fix_delta_angle(math.atan2(v2.y, v2.x) - self.start_angle, self.direction)
+        else:
+            self.start_angle = self.delta_angle = None
 
-    def get_delta_angle(self) -> T_Num:
-        """
-        Get the angular difference, including positive/negative angles.
-
-        Returns:
-            T_Num: Angular difference.
-        """
-        v1 = self.center.get_vector2(self.start)
-        v2 = self.center.get_vector2(self.end)
-        # Calculate positive/negative angles
-        angle1 = math.atan2(v1.y, v1.x)
-        angle2 = math.atan2(v2.y, v2.x)
-
-        # Calculate angular difference
-        delta_angle = angle2 - angle1
-
+    @staticmethod
+    def _fix_delta_angle(delta_angle: T_Num, direction: T_Num) -> T_Num:
         # Adjust the difference based on rotation direction
-        if self.direction > 0:
+        if direction > 0:
             if delta_angle < 0:
                 delta_angle += 2 * math.pi
         else:
@@ -311,37 +501,43 @@ class Arc2:
                 delta_angle -= 2 * math.pi
         return delta_angle
 
-    def get_points(self, density: T_Num = 0.1) -> List[Point2]:
+    def get_delta_angle(self) -> T_Num:
         """
-        获取沿弧等间隔的坐标，使用numpy。
+        Get the angular difference, including positive/negative angles.
+
+        Returns:
+            T_Num: Angular difference.
+        """
+        if self.center is None:
+            raise ValueError('A straight arc has no angle')
+        return self.delta_angle
+
+    def get_points_array(self, density: T_Num = 0.1) -> np.ndarray:
+        """
+        获取沿弧等间隔的坐标数组。
 
         Args:
             density (T_Num): 点的密度。
 
         Returns:
-            np.ndarray: Array of coordinates at equal intervals along the arc.
+            np.ndarray: Array of coordinates at equal intervals along the arc, shape (N, 2).
         """
         # 生成一个表示进度的数组
         p = np.linspace(0, 1, int(self.length / density))
+        angle = self.start_angle + self.delta_angle * p
+        return np.stack([self.center.x + self.radius * np.cos(angle), self.center.y + self.radius * np.sin(angle)], axis=-1)
 
-        # 计算每个进度的角度
-        v1 = self.center.get_vector2(self.start)
-        angle1 = math.atan2(v1.y, v1.x)
-        delta_angle = self.get_delta_angle()
-
-        # Adjust the difference based on rotation direction
-        if self.direction > 0:
-            if delta_angle < 0:
-                delta_angle += 2 * math.pi
-        else:
-            if delta_angle > 0:
-                delta_angle -= 2 * math.pi
+    def get_points(self, density: T_Num = 0.1) -> List[Point2]:
+        """
+        获取沿弧等间隔的坐标，使用numpy。
 
-        # 使用numpy的cos和sin函数批量计算每个进度的坐标
-        x = self.center.x + self.radius * np.cos(angle1 + delta_angle * p)
-        y = self.center.y + self.radius * np.sin(angle1 + delta_angle * p)
+        Args:
+            density (T_Num): 点的密度。
 
-        return [Point2(x[i], y[i]) for i in range(len(x))]
+        Returns:
+            List[Point2]: Points at equal intervals along the arc.
+        """
+        return [Point2(x, y) for x, y in self.get_points_array(density).tolist()]
 
     def get_pos(self, p: T_Num) -> Point2:
         """
@@ -353,21 +549,10 @@ class Arc2:
         Returns:
             Point2: Coordinates at the specified rotation progress.
         """
-        v1 = self.center.get_vector2(self.start)
-        angle1 = math.atan2(v1.y, v1.x)
-        delta_angle = self.get_delta_angle()
-
-        # Adjust the difference based on rotation direction
-        if self.direction > 0:
-            if delta_angle < 0:
-                delta_angle += 2 * math.pi
-        else:
-            if delta_angle > 0:
-                delta_angle -= 2 * math.pi
-
+        angle = self.start_angle + self.delta_angle * p
         return Point2(
-            self.center.x + self.radius * math.cos(angle1 + delta_angle * p),
-            self.center.y + self.radius * math.sin(angle1 + delta_angle * p)
+            self.center.x + self.radius * math.cos(angle),
+            self.center.y + self.radius * math.sin(angle)
         )
 
     @property
@@ -378,17 +563,7 @@ class Arc2:
         Returns:
             T_Num: Arc length.
         """
-        delta_angle = self.get_delta_angle()
-
-        # Adjust the difference based on rotation direction
-        if self.direction > 0:
-            if delta_angle < 0:
-                delta_angle += 2 * math.pi
-        else:
-            if delta_angle > 0:
-                delta_angle -= 2 * math.pi
-
-        return self.radius * abs(delta_angle)
+        return self.radius * abs(self.get_delta_angle())
 
     def get_vector2(self, p: T_Num) -> 'Vector2':
         """
@@ -400,25 +575,143 @@ class Arc2:
         Returns:
             Vector2: Tangent vector at the specified rotation progress.
         """
-        v1 = self.center.get_vector2(self.start)
-        angle1 = math.atan2(v1.y, v1.x)
-        delta_angle = self.get_delta_angle()
+        angle = self.start_angle + self.delta_angle * p
+        return Vector2(
+            -self.radius * math.sin(angle),
+            self.radius * math.cos(angle)
+        )
 
-        # Adjust the difference based on rotation direction
-        if self.direction > 0:
-            if delta_angle < 0:
-                delta_angle += 2 * math.pi
-        else:
-            if delta_angle > 0:
-                delta_angle -= 2 * math.pi
 
-        return Vector2(
-            -self.radius * math.sin(angle1 + delta_angle * p),
-            self.radius * math.cos(angle1 + delta_angle * p)
+class Arc2Array:
+    def __init__(self, centers: np.ndarray, starts: np.ndarray, ends: np.ndarray, directions: np.ndarray):
+        """
+        Initialize a collection of 2D arcs stored in NumPy arrays.
+
+        Rows whose center is NaN are straight lines from start to end, like Arc2 with center None.
+
+        Args:
+            centers: Centers with shape (N, 2).
+            starts: Start points with shape (N, 2).
+            ends: End points with shape (N, 2).
+            directions: Rotation directions with shape (N,), positive for positive angles.
+        """
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        self.starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        self.ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        self.directions = np.sign(np.asarray(directions, dtype=np.float64)).reshape(-1)
+        self.is_arc = ~np.isnan(self.centers).any(axis=1)
+
+        v1 = self.starts - self.centers
+        v2 = self.ends - self.centers
+        self.radii = np.where(self.is_arc, np.hypot(v1[:, 0], v1[:, 1]), 0)
+        self.start_angles = np.where(self.is_arc, np.arctan2(v1[:, 1], v1[:, 0]), 0)
+        delta = np.arctan2(v2[:, 1], v2[:, 0]) - self.start_angles
+        # Adjust the difference based on rotation direction, same as Arc2
+        delta = np.where((self.directions > 0) & (delta < 0), delta + 2 * math.pi, delta)
+        delta = np.where((self.directions <= 0) & (delta > 0), delta - 2 * math.pi, delta)
+        self.delta_angles = np.where(self.is_arc, delta, 0)
+
+    @staticmethod
+    def from_arcs(arcs: List[Arc2]) -> 'Arc2Array':
+        """
+        Build an Arc2Array from Arc2 objects.
+
+        Args:
+            arcs: Arc2 objects.
+
+        Returns:
+            Arc2Array: The arc collection.
+        """
+        nan = float('nan')
+        return Arc2Array(
+            centers=[(a.center.x, a.center.y) if a.center is not None else (nan, nan) for a in arcs],
+            starts=[(a.start.x, a.start.y) for a in arcs],
+            ends=[(a.end.x, a.end.y) for a in arcs],
+            directions=[a.direction for a in arcs]
         )
 
+    def __len__(self):
+        return len(self.centers)
+
+    def __getitem__(self, index) -> 'Arc2Array':
+        index = np.arange(len(self))[index].reshape(-1)
+        return Arc2Array(self.centers[index], self.starts[index], self.ends[index], self.directions[index])
+
+    def get_pos_at(self, index: np.ndarray, p: np.ndarray) -> np.ndarray:
+        """
+        Get the coordinates of arc index[i] at progress p[i], for ragged sampling.
+
+        Args:
+            index: Arc indices with shape (K,).
+            p: Progress values with shape (K,).
+
+        Returns:
+            np.ndarray: Coordinates with shape (K, 2).
+        """
+        angle = self.start_angles[index] + self.delta_angles[index] * p
+        radius = self.radii[index, None]
+        arc = self.centers[index] + radius * np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+        line = self.starts[index] + (self.ends[index] - self.starts[index]) * p[:, None]
+        return np.where(self.is_arc[index, None], arc, line)
+
+    @staticmethod
+    def _progress(p: T_Num | np.ndarray) -> np.ndarray:
+        # 标量或(M,)对所有弧共用，(N, M)为每条弧单独的进度
+        p = np.asarray(p, dtype=np.float64)
+        return p.reshape(1, -1) if p.ndim <= 1 else p
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """
+        Get the length of every arc, straight lines use the distance between start and end.
+
+        Returns:
+            np.ndarray: Lengths with shape (N,).
+        """
+        chord = self.ends - self.starts
+        return np.where(self.is_arc, self.radii * np.abs(self.delta_angles), np.hypot(chord[:, 0], chord[:, 1]))
+
+    def get_pos(self, p: T_Num | np.ndarray) -> np.ndarray:
+        """
+        Get the coordinates of every arc at the given progress values in one broadcasted call.
+
+        Args:
+            p: Progress in [0, 1], a scalar, (M,) shared by all arcs or (N, M) per arc.
+
+        Returns:
+            np.ndarray: Coordinates with shape (N, 2) for a scalar p, otherwise (N, M, 2).
+        """
+        scalar = np.ndim(p) == 0
+        p = self._progress(p)
+        angle = self.start_angles[:, None] + self.delta_angles[:, None] * p
+        arc = self.centers[:, None, :] + self.radii[:, None, None] * np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+        line = self.starts[:, None, :] + (self.ends - self.starts)[:, None, :] * p[..., None]
+        pos = np.where(self.is_arc[:, None, None], arc, line)
+        return pos[:, 0] if scalar else pos
+
+    def get_vector2(self, p: T_Num | np.ndarray) -> np.ndarray:
+        """
+        Get the tangent vectors of every arc at the given progress values, same as Arc2.get_vector2.
+        Straight lines use the vector from start to end.
+
+        Args:
+            p: Progress in [0, 1], a scalar, (M,) shared by all arcs or (N, M) per arc.
+
+        Returns:
+            np.ndarray: Tangent vectors with shape (N, 2) for a scalar p, otherwise (N, M, 2).
+        """
+        scalar = np.ndim(p) == 0
+        p = self._progress(p)
+        angle = self.start_angles[:, None] + self.delta_angles[:, None] * p
+        arc = self.radii[:, None, None] * np.stack([-np.sin(angle), np.cos(angle)], axis=-1)
+        line = np.broadcast_to((self.ends - self.starts)[:, None, :], arc.shape)
+        vector = np.where(self.is_arc[:, None, None], arc, line)
+        return vector[:, 0] if scalar else vector
+
 
 class Vector2:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         """
         Initialize a 2D vector.
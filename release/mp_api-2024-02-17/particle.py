@@ -1,9 +1,29 @@
+import sys
+
 from .mp_typing import T_Exp, T_Color
-from .utils import func2math_exp
-from typing import Callable
+from .utils import ExprTemplate, func2math_exp
+from typing import Callable, List
+
+
+class _DescriptorField:
+    """
+    参与生成粒子描述的属性，重新赋值时使缓存的粒子描述失效。只定义__set__，读取时直接取实例字典中的值。
+    """
+    __slots__ = ('name',)
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __set__(self, instance: 'BaseParticle', value):
+        attributes = instance.__dict__
+        attributes[self.name] = value
+        attributes['_descriptor'] = None
 
 
 class BaseParticle:
+    _name = _DescriptorField()
+    _descriptor: str | None = None
+
     def __init__(self, name: str = ''):
         """
         代表粒子的基础类。
@@ -13,18 +33,43 @@ class BaseParticle:
         """
         self._name = name
 
+    def _compile(self) -> str:
+        """
+        生成粒子的名称字符串，子类重写此方法，用到的属性需要声明为_DescriptorField。
+
+        返回：
+        str: 粒子的名称字符串。
+        """
+        return self._name
+
+    def invalidate(self):
+        """
+        使缓存的粒子描述失效。_DescriptorField属性重新赋值时会自动失效，原地修改列表等属性后需要手动调用。
+        """
+        self._descriptor = None
+
     @property
     def name(self) -> str:
         """
-        获取粒子的名称。
+        获取粒子的名称。描述字符串只在属性改变后第一次访问时生成，并被驻留以便共享。
 
         返回：
         str: 粒子的名称。
         """
-        return self._name
+        descriptor = self._descriptor
+        if descriptor is None:
+            descriptor = self._descriptor = sys.intern(self._compile())
+        return descriptor
 
 
 class BestParticle(BaseParticle):
+    x_exp = _DescriptorField()
+    y_exp = _DescriptorField()
+    z_exp = _DescriptorField()
+    life = _DescriptorField()
+    rand = _DescriptorField()
+    color = _DescriptorField()
+
     def __init__(
             self,
             x_exp: T_Exp = lambda t: 0,
@@ -46,18 +91,69 @@ class BestParticle(BaseParticle):
         else:
             self.color = color
 
-    @property
-    def name(self) -> str:
+    def _compile(self) -> str:
         """
-        获取粒子的名称字符串。
+        生成粒子的名称字符串。
 
         返回：
         str: 粒子的名称字符串。
         """
         return f"soy:best '{self.x_exp}' '{self.y_exp}' '{self.z_exp}' {self.life} {self.rand} '{self.color}'"
 
+    @staticmethod
+    def from_template(x_exp: ExprTemplate | str, y_exp: ExprTemplate | str, z_exp: ExprTemplate | str,
+                      life: int = 1, rand: int = 1, color: T_Color = 'white', **params) -> List['BestParticle']:
+        """
+        用表达式模板批量创建粒子，每个模板只解析一次，逐点参数一次性格式化。
+
+        参数：
+        - x_exp, y_exp, z_exp (ExprTemplate | str): 坐标表达式模板，如 '(t/{T})*{x}'。
+        - life (int): 粒子寿命。
+        - rand (int): 随机值。
+        - color (T_Color): 颜色。
+        - **params: 模板字段的值，标量或形状为(N,)的数组。
+
+        返回：
+        List[BestParticle]: 每组参数一个粒子。
+        """
+        rows = [_as_template(e).render_many(**{k: v for k, v in params.items() if k in _as_template(e).fields})
+                for e in (x_exp, y_exp, z_exp)]
+        size = max(len(r) for r in rows)
+        rows = [r * size if len(r) == 1 else r for r in rows]
+        return [BestParticle(x, y, z, life, rand, color) for x, y, z in zip(*rows)]
+
+    @staticmethod
+    def render_names(x_exp: ExprTemplate | str, y_exp: ExprTemplate | str, z_exp: ExprTemplate | str,
+                     life: int = 1, rand: int = 1, color: T_Color = 'white', **params) -> List[str]:
+        """
+        用表达式模板批量生成粒子名称字符串，不创建粒子对象，可直接作为 ParticleEventBatch 的逐事件粒子。
+
+        参数：
+        - x_exp, y_exp, z_exp (ExprTemplate | str): 坐标表达式模板，如 '(t/{T})*{x}'。
+        - life (int): 粒子寿命。
+        - rand (int): 随机值。
+        - color (T_Color): 颜色。
+        - **params: 模板字段的值，标量或形状为(N,)的数组。
+
+        返回：
+        List[str]: 每组参数一个粒子名称字符串，与 BestParticle.name 相同。
+        """
+        x, y, z = _as_template(x_exp), _as_template(y_exp), _as_template(z_exp)
+        constants = ' '.join(str(v).replace('{', '{{').replace('}', '}}') for v in (life, rand))
+        color = str(color).replace('{', '{{').replace('}', '}}')
+        template = ExprTemplate(f"soy:best '{x.template}' '{y.template}' '{z.template}' {constants} '{color}'", x.precision)
+        return template.render_many(**params)
+
+
+def _as_template(exp: ExprTemplate | str) -> ExprTemplate:
+    return exp if isinstance(exp, ExprTemplate) else ExprTemplate(exp)
+
 
 class ColorLifeParticle(BaseParticle):
+    color = _DescriptorField()
+    life = _DescriptorField()
+    rand = _DescriptorField()
+
     def __init__(self,
                  color: T_Color = 'white',
                  life: int = 1,
@@ -68,10 +164,9 @@ class ColorLifeParticle(BaseParticle):
         self.life = life
         self.rand = rand
 
-    @property
-    def name(self) -> str:
+    def _compile(self) -> str:
         """
-        获取粒子的名称字符串。
+        生成粒子的名称字符串。
 
         返回：
         str: 粒子的名称字符串。
@@ -80,6 +175,12 @@ class ColorLifeParticle(BaseParticle):
 
 
 class ColorLifeScaleTextureParticle(BaseParticle):
+    color = _DescriptorField()
+    life = _DescriptorField()
+    rand = _DescriptorField()
+    scale = _DescriptorField()
+    texture = _DescriptorField()
+
     def __init__(
             self,
             color: T_Color = 'white',
@@ -95,10 +196,9 @@ class ColorLifeScaleTextureParticle(BaseParticle):
         self.scale = scale
         self.texture = texture
 
-    @property
-    def name(self) -> str:
+    def _compile(self) -> str:
         """
-        获取粒子的名称字符串。
+        生成粒子的名称字符串。
 
         返回：
         str: 粒子的名称字符串。
@@ -107,6 +207,14 @@ class ColorLifeScaleTextureParticle(BaseParticle):
 
 
 class SeqParticle(BaseParticle):
+    x_list = _DescriptorField()
+    y_list = _DescriptorField()
+    z_list = _DescriptorField()
+    life = _DescriptorField()
+    rand = _DescriptorField()
+    color_list = _DescriptorField()
+    scale_list = _DescriptorField()
+
     def __init__(self,
                  x_list: list,
                  y_list: list,
@@ -125,10 +233,9 @@ class SeqParticle(BaseParticle):
         self.color_list = color_list
         self.scale_list = scale_list
 
-    @property
-    def name(self) -> str:
+    def _compile(self) -> str:
         """
-        获取粒子的名称字符串。
+        生成粒子的名称字符串。
 
         返回：
         str: 粒子的名称字符串。
@@ -137,6 +244,15 @@ class SeqParticle(BaseParticle):
 
 
 class SeqtParticle(BaseParticle):
+    x_list = _DescriptorField()
+    y_list = _DescriptorField()
+    z_list = _DescriptorField()
+    life = _DescriptorField()
+    rand = _DescriptorField()
+    color_list = _DescriptorField()
+    scale_list = _DescriptorField()
+    texture = _DescriptorField()
+
     def __init__(self,
                  x_list: list,
                  y_list: list,
@@ -157,10 +273,9 @@ class SeqtParticle(BaseParticle):
         self.scale_list = scale_list
         self.texture = texture
 
-    @property
-    def name(self) -> str:
+    def _compile(self) -> str:
         """
-        获取粒子的名称字符串。
+        生成粒子的名称字符串。
 
         返回：
         str: 粒子的名称字符串。
@@ -1,9 +1,9 @@
 import math
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 from typing import Callable, List, Tuple
-from .mp_math import Arc2, Point3
+from .mp_math import Arc2, Arc2Array
 from .mp_typing import T_Num
 
 
@@ -17,7 +17,8 @@ class ParticleLine:
                  length: T_Num = 0
                  ):
         """
-        代表三维空间中的粒子运动线。
+        代表三维空间中的粒子运动线。坐标函数最好支持 numpy 广播(使用 np.cos 等而非 math.cos)，
+        这样 get_pos_batch 可以一次算出所有进度的位置，否则会逐个求值。
 
         参数：
         - start_time (T_Num): 线的起始时间。
@@ -70,6 +71,93 @@ class ParticleLine:
         x2, y2, z2 = self.get_pos(p + delta)
         return (x2 - x1) / (2 * delta), (y2 - y1) / (2 * delta), (z2 - z1) / (2 * delta)
 
+    def get_pos_batch(self,
+                      p: np.ndarray
+                      ) -> np.ndarray:
+        """
+        批量获取一组进度因子的位置。
+
+        参数：
+        - p (np.ndarray): 形状为(N,)的进度因子数组。
+
+        返回：
+        np.ndarray: 形状为(N, 3)的 X、Y、Z 坐标数组。
+        """
+        p = np.asarray(p, dtype=np.float64).reshape(-1)
+        return np.stack([_eval_fun(self.x_fun, p), _eval_fun(self.y_fun, p), _eval_fun(self.z_fun, p)], axis=-1)
+
+    def sample(self,
+               spacing: T_Num,
+               resolution: int = 64,
+               adaptive: bool = False,
+               max_angle: T_Num = 0.2,
+               max_depth: int = 8
+               ) -> np.ndarray:
+        """
+        按空间距离等间隔采样，而不是按进度系数等间隔采样。
+
+        先向量化计算累积弧长表，再在弧长上均匀取点。adaptive 为 True 时，在拐角处加密弧长表，
+        并保证相邻两点之间的转角不超过 max_angle，直线部分仍按 spacing 取点。
+
+        参数：
+        - spacing (T_Num): 目标点间距(方块)。
+        - resolution (int): 初始弧长表的分段数。
+        - adaptive (bool): 是否按曲率自适应加密。
+        - max_angle (T_Num): 自适应时相邻采样段的最大转角(弧度)。
+        - max_depth (int): 自适应时弧长表的最大细分次数。
+
+        返回：
+        np.ndarray: 形状为(N, 4)的数组，每行为 x, y, z, t，t 为该点对应的时间。
+        """
+        p = np.linspace(0, 1, resolution + 1)
+        pos = self.get_pos_batch(p)
+        for _ in range(max_depth if adaptive else 0):
+            angle = _turning_angles(pos)
+            # 拆分两端转角过大的分段
+            split = (angle[:-1] > max_angle) | (angle[1:] > max_angle)
+            if not split.any():
+                break
+            p = np.sort(np.concatenate([p, (p[:-1] + p[1:])[split] / 2]))
+            pos = self.get_pos_batch(p)
+
+        segment = np.linalg.norm(np.diff(pos, axis=0), axis=-1)
+        if adaptive:
+            angle = _turning_angles(pos)
+            # 转角需要的步数和距离需要的步数取大者，折算为等效长度
+            segment = np.maximum(segment, (angle[:-1] + angle[1:]) / 2 * spacing / max_angle)
+        table = np.concatenate([[0], np.cumsum(segment)])
+
+        num = max(int(math.ceil(table[-1] / spacing)), 1) + 1
+        p = np.interp(np.linspace(0, table[-1], num), table, p)
+        t = self.start_time + (self.end_time - self.start_time) * p
+        return np.concatenate([self.get_pos_batch(p), t[:, None]], axis=-1)
+
+
+def _eval_fun(fun: Callable, p: np.ndarray) -> np.ndarray:
+    """
+    对进度数组求值，函数不支持数组(如使用math.cos)时逐个求值。
+    """
+    try:
+        value = fun(p)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or np.shape(value) not in (p.shape, ()):
+        return np.array([fun(x) for x in p.tolist()], dtype=np.float64)
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), p.shape)
+
+
+def _turning_angles(pos: np.ndarray) -> np.ndarray:
+    """
+    折线每个顶点处的转角，首尾顶点为0。
+    """
+    d = np.diff(pos, axis=0)
+    norm = np.linalg.norm(d, axis=-1)
+    dot = np.sum(d[:-1] * d[1:], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos = dot / (norm[:-1] * norm[1:])
+    angle = np.arccos(np.clip(np.nan_to_num(cos, nan=1.0), -1, 1))
+    return np.concatenate([[0], angle, [0]])
+
 
 def arc22pl(arc: Arc2, y_fun: Callable, npt: int = 20) -> ParticleLine:
     """
@@ -85,45 +173,91 @@ def arc22pl(arc: Arc2, y_fun: Callable, npt: int = 20) -> ParticleLine:
     """
     # 如果弧没有中心，创建一条直线
     if arc.center is None or arc.length / (arc.end.x - arc.start.x) > npt:
+        sx, sz = arc.start.x, arc.start.y
+        dx, dz = arc.end.x - arc.start.x, arc.end.y - arc.start.y
         return ParticleLine(
             start_time=arc.start.x,
             end_time=arc.end.x,
-            x_fun=lambda p: arc.start.x + (arc.end.x - arc.start.x) * p,
-            y_fun=lambda p: y_fun(p),
-            z_fun=lambda p: arc.start.y + (arc.end.y - arc.start.y) * p,
+            x_fun=lambda p: sx + dx * p,
+            y_fun=y_fun,
+            z_fun=lambda p: sz + dz * p,
             length=arc.start.get_distance(arc.end)
         )
-    # 如果弧有中心，创建一个代表弧的 ParticleLine
+    # 如果弧有中心，创建一个代表弧的 ParticleLine，起始角和角度差只计算一次
+    cx, cz, r = arc.center.x, arc.center.y, arc.radius
+    a1, da = arc.start_angle, arc.delta_angle
     return ParticleLine(
         start_time=arc.start.x,
         end_time=arc.end.x,
-        x_fun=lambda p: arc.center.x + arc.radius * math.cos(math.atan2(arc.start.y - arc.center.y, arc.start.x - arc.center.x) + arc.get_delta_angle() * p),
+        x_fun=lambda p: cx + r * np.cos(a1 + da * p),
         y_fun=y_fun,
-        z_fun=lambda p: arc.center.y + arc.radius * math.sin(math.atan2(arc.start.y - arc.center.y, arc.start.x - arc.center.x) + arc.get_delta_angle() * p),
+        z_fun=lambda p: cz + r * np.sin(a1 + da * p),
         length=arc.length
     )
 
 
-def arc2s2point3s(arc2s: List[Arc2], y_fun: Callable[[List[T_Num]], List[T_Num]], density: float = 0.1, max_npt: int = 40, threads: int = 1) -> List[Point3]:
+def _sample_arcs(arcs: Arc2Array, ys: np.ndarray | None, density: float, max_npt: int) -> np.ndarray:
+    """
+    在一块弧上按间距density采样，返回形状为(K, 4)的x, y, z, t数组，ys为None时y为nan。
+    """
+    dx = np.abs(arcs.ends[:, 0] - arcs.starts[:, 0])
+    num = np.maximum((arcs.lengths / density).astype(np.int64), 2)
+    if max_npt:
+        # 每tick粒子数超出max_npt的弧用直线代替，且点数不超过max_npt * dx
+        limit = np.maximum(np.ceil(max_npt * dx).astype(np.int64), 2)
+        too_dense = arcs.is_arc & (num > limit)
+        if too_dense.any():
+            centers = arcs.centers.copy()
+            centers[too_dense] = np.nan
+            arcs = Arc2Array(centers, arcs.starts, arcs.ends, arcs.directions)
+            num = np.maximum((arcs.lengths / density).astype(np.int64), 2)
+        num = np.minimum(num, limit)
+
+    # 展开为不等长的(弧序号, 进度)对
+    index = np.repeat(np.arange(len(arcs)), num)
+    offset = np.repeat(np.cumsum(num) - num, num)
+    p = (np.arange(len(index)) - offset) / (num[index] - 1)
+
+    xz = arcs.get_pos_at(index, p)
+    t = arcs.starts[index, 0] + (arcs.ends[index, 0] - arcs.starts[index, 0]) * p
+    y = ys[index, 0] + (ys[index, 1] - ys[index, 0]) * p if ys is not None else np.full(len(p), np.nan)
+    return np.stack([xz[:, 0], y, xz[:, 1], t], axis=-1)
+
+
+def arc2s2point3s(arc2s: List[Arc2] | Arc2Array, y_fun: Callable[[np.ndarray], np.ndarray] | np.ndarray, density: float = 0.1,
+                  max_npt: int = 40, workers: int = 1, chunk_size: int = 4096) -> np.ndarray:
     """
-    将 Arc2 Soma3 对象列表转换为用于粒子运动的 Point3 对象列表。使用np和多线程批量计算，不经过粒子线阶段
+    将 Arc2 Soma3 弧批量转换为采样点。使用np批量计算，弧数量较多时分块交给进程池，不经过粒子线阶段
 
     参数：
-    - arc2s (List[Arc2]): 代表二维空间中弧的 Arc2 对象列表。
-    - y_fun (Callable): 随时间变化定义 Y 坐标的函数。
-    - density (float): 粒子线的密度。
-    - max_npt (int): 每tick最大粒子数，超出后用直线代替(可改)。
-    - threads (int): 线程数。
+    - arc2s (List[Arc2] | Arc2Array): 代表二维空间中弧的 Arc2 对象列表或 Arc2Array。
+    - y_fun (Callable | np.ndarray): 随时间变化定义 Y 坐标的函数，接收时间数组返回 Y 数组；
+      或形状为(N, 2)的每条弧起止点 Y 坐标(如 Soma.soma3_2d_arcs 的返回值)，Y 在其间线性变化。
+    - density (float): 采样点的间距。
+    - max_npt (int): 每tick最大粒子数，超出后用直线代替(可改)，为0时不限制。
+    - workers (int): 进程数，大于1且弧数量超过chunk_size时使用进程池。
+    - chunk_size (int): 每个进程任务处理的弧数量。
 
     返回：
-    List[Point3]: 代表转换后的弧的 Point3 对象列表。
+    np.ndarray: 形状为(N, 4)的数组，每行为 x, y, z, t，t 为该点对应的时间。
     """
-    points = []
+    arcs = arc2s if isinstance(arc2s, Arc2Array) else Arc2Array.from_arcs(arc2s)
+    ys = np.asarray(y_fun, dtype=np.float64).reshape(-1, 2) if not callable(y_fun) else None
 
-    # 把三角函数参数全部转成numpy数组
-    x = [np.array([arc2.start.x, arc2.end.x]) for arc2 in arc2s]
-    y = y_fun()
+    if workers > 1 and len(arcs) > chunk_size:
+        bounds = range(0, len(arcs), chunk_size)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(
+                _sample_arcs,
+                [arcs[i:i + chunk_size] for i in bounds],
+                [ys[i:i + chunk_size] if ys is not None else None for i in bounds],
+                [density] * len(bounds),
+                [max_npt] * len(bounds)
+            ))
+        points = np.concatenate(chunks) if chunks else np.empty((0, 4))
+    else:
+        points = _sample_arcs(arcs, ys, density, max_npt)
 
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        for arc2 in arc2s:
-            points.append(executor.submit(arc22pl, arc2, y_fun))
+    if ys is None:
+        points[:, 1] = y_fun(points[:, 3])
+    return points
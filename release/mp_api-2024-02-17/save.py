@@ -1,13 +1,144 @@
+import asyncio
+import atexit
+import hashlib
+import json
 import os
 import time
+import weakref
 
 from . import config
-from concurrent.futures import ThreadPoolExecutor
-from typing import List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Tuple
 from tqdm import tqdm
-from PIL import Image
 
 from .event import MCFunction
+from .sink import make_temp_file
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from .timeline import Timeline
+
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+
+class OutputStats(object):
+    def __init__(self, functions: int = 0, commands: int = 0, bytes: int = 0, seconds: float = 0.0,
+                 skipped: int = 0, deleted: int = 0, saved: int = 0):
+        """
+        Statistics of one Save.output() call.
+        :param functions: number of functions exported
+        :param commands: number of commands exported
+        :param bytes: number of bytes written
+        :param seconds: wall time of the output
+        :param skipped: number of unchanged functions that were not rewritten
+        :param deleted: number of stale function files removed
+        :param saved: number of particle commands merged by MCFunction dedup
+        """
+        self.functions = functions
+        self.commands = commands
+        self.bytes = bytes
+        self.seconds = seconds
+        self.skipped = skipped
+        self.deleted = deleted
+        self.saved = saved
+
+    @property
+    def throughput(self) -> float:
+        """
+        Written megabytes per second.
+        """
+        return self.bytes / 1024 ** 2 / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f'Functions: {self.functions}, Commands: {self.commands}, Bytes: {self.bytes}, ' \
+               f'Skipped: {self.skipped}, Deleted: {self.deleted}, Saved: {self.saved}, ' \
+               f'Time: {self.seconds:.2f}s, Throughput: {self.throughput:.2f}MB/s'
+
+
+def _write_atomic(path: str, data: bytes) -> int:
+    """
+    Write data to a temporary file in the same directory and rename it to path.
+    :return: number of bytes written
+    """
+    fd, tmp_path = make_temp_file(os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(data)
+
+
+def _encode_function(commands: List[str]) -> Tuple[bytes, str]:
+    data = '\n'.join(commands).encode('utf-8')
+    return data, hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _is_unchanged(path: str, data: bytes, digest: str, old_digest: str | None) -> bool:
+    return digest == old_digest and os.path.exists(path) and os.path.getsize(path) == len(data)
+
+
+def _write_function_file(job: Tuple[str, List[str], str | None]) -> Tuple[int, str, bool]:
+    """
+    Encode and hash one function, write it unless it matches old_digest.
+    :return: bytes written, digest, whether the file was written
+    """
+    path, commands, old_digest = job
+    data, digest = _encode_function(commands)
+    if _is_unchanged(path, data, digest, old_digest):
+        return 0, digest, False
+    return _write_atomic(path, data), digest, True
+
+
+async def _write_function_files_async(jobs: List[Tuple[str, List[str], str | None]], num_threads: int,
+                                      progress: dict) -> List[Tuple[int, str, bool]]:
+    semaphore = asyncio.Semaphore(num_threads)
+    bar = tqdm(**progress)
+
+    async def write(path: str, commands: List[str], old_digest: str | None) -> Tuple[int, str, bool]:
+        data, digest = _encode_function(commands)
+        if _is_unchanged(path, data, digest, old_digest):
+            bar.update()
+            return 0, digest, False
+        async with semaphore:
+            if aiofiles is None:
+                size = await asyncio.to_thread(_write_atomic, path, data)
+            else:
+                fd, tmp_path = make_temp_file(os.path.dirname(path))
+                os.close(fd)
+                try:
+                    async with aiofiles.open(tmp_path, 'wb') as f:
+                        await f.write(data)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+                size = len(data)
+        bar.update()
+        return size, digest, True
+
+    try:
+        return await asyncio.gather(*[write(*job) for job in jobs])
+    finally:
+        bar.close()
+
+
+# 解释器退出时线程池已经关闭，未导出的Save在atexit中逐个写出
+_live_saves: 'weakref.WeakSet[Save]' = weakref.WeakSet()
+
+
+@atexit.register
+def _output_at_exit():
+    for save in list(_live_saves):
+        if save.has_pending_output:
+            save.output(backend='serial')
 
 
 class Save(object):
@@ -27,14 +158,34 @@ class Save(object):
 
 
         self.function_list: List[MCFunction] = []
+        self._created_dirs = set()
+        # 上次output()时各函数的指令数，用于判断退出时是否还需要导出
+        self._output_state: List[Tuple[int, int]] | None = None
+        _live_saves.add(self)
 
     def add_function(self,
                      function: MCFunction
                      ) -> MCFunction:
         function.namespace = self.namespace
+        if function.stream and function.sink is None:
+            function.open_sink(self.get_function_path(function.name))
         self.function_list.append(function)
         return function
 
+    def add_timeline(self,
+                     timeline: 'Timeline'
+                     ) -> List[MCFunction]:
+        """
+        Compile a timeline in the namespace of this save and add all its functions,
+        stream-mode tick functions are written to disk while they are filled.
+        :param timeline: the timeline
+        :return: the added functions, the entry point first
+        """
+        return timeline.compile(self.namespace, self.add_function)
+
+    def get_function_path(self, name: str) -> str:
+        return f'{self.path}/datapacks/{self.datapack}/data/{self.namespace}/functions/{name}.mcfunction'
+
     def get_function(self, name: str) -> MCFunction:
         for function in self.function_list:
             if function.name == name:
@@ -49,25 +200,116 @@ class Save(object):
     def game_resourcepack(self):
         return os.path.join(self.game_root, 'resourcepacks', self.resourcepack)
 
-    def output(self, num_threads: int = config.max_thread):
-        event_count, function_count, sum_event_count = 0, 0, 0
+    def _makedirs(self, path: str):
+        if path not in self._created_dirs:
+            os.makedirs(path, exist_ok=True)
+            self._created_dirs.add(path)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, 'datapacks', self.datapack, 'mcfunction_manifest.json')
 
-        def process_function(mcfunction):
-            nonlocal event_count, function_count
-            function_count += 1
-            event_count += len(mcfunction.commands)
-            function_path = f'{self.path}/datapacks/{self.datapack}/data/{self.namespace}/functions/{mcfunction.name}.mcfunction'
-            if not os.path.exists(os.path.dirname(function_path)):
-                os.makedirs(os.path.dirname(function_path), exist_ok=True)
-            with open(file=function_path, mode='w', encoding='utf-8') as f:
-                f.write('\n'.join(mcfunction.commands))
+    def load_manifest(self) -> Dict[str, str]:
+        """
+        Load the content hashes of the last export, keyed by 'namespace:name'.
+        """
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            return json.load(f).get('functions', {})
 
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            list(tqdm(executor.map(process_function, self.function_list), total=len(self.function_list), desc='mcfunction output', colour='blue', ncols=config.max_ncols))
-        print(f'Functions: {function_count}, Events: {event_count}, SumEvents: {sum_event_count}, Time: {time.time() - self.time_start:.2f}s')
+    def output(self, num_threads: int = config.max_thread, backend: str = config.output_backend,
+               incremental: bool = config.incremental_output, prune: bool = config.prune_output) -> 'OutputStats':
+        """
+        Write all functions to the datapack, each file is written to a temporary file and renamed into place.
+        The content hash of every function is stored in a manifest inside the datapack.
+        :param num_threads: number of workers
+        :param backend: 'thread', 'process', 'async' or 'serial', 'async' uses aiofiles when it is installed,
+            'serial' writes in the calling thread
+        :param incremental: skip functions whose hash matches the manifest
+        :param prune: delete the files of functions in this namespace that were exported last time but not
+            this time (only when this Save has functions), other Saves writing the same namespace lose their files
+        :return: output statistics
+        """
+        stats = OutputStats()
+        start = time.perf_counter()
+        old_manifest = self.load_manifest()
+        # 不清理时保留其他Save和未添加任何函数的Save上次导出的记录
+        prune = prune and bool(self.function_list)
+        manifest = {k: v for k, v in old_manifest.items()
+                    if not prune or not k.startswith(f'{self.namespace}:')}
+        jobs: List[Tuple[str, List[str], str | None]] = []
+        names: List[str] = []
+        for mcfunction in self.function_list:
+            stats.functions += 1
+            stats.commands += mcfunction.command_count
+            stats.saved += mcfunction.saved_commands
+            key = f'{self.namespace}:{mcfunction.name}'
+            if mcfunction.sink is not None:
+                # 流式函数已经写入临时文件，只需收尾，内容与上次导出相同时保留旧文件
+                # 已经关闭的在之前的output()中统计过
+                written = not mcfunction.sink.closed and mcfunction.close(old_manifest.get(key) if incremental else None)
+                stats.bytes += mcfunction.sink.bytes_written if written else 0
+                stats.skipped += not written
+                manifest[key] = mcfunction.sink.digest
+                continue
+            function_path = self.get_function_path(mcfunction.name)
+            # 每个目录只创建一次，且在分发任务前完成
+            self._makedirs(os.path.dirname(function_path))
+            jobs.append((function_path, mcfunction.commands, old_manifest.get(key) if incremental else None))
+            names.append(key)
+
+        progress = dict(total=len(jobs), desc='mcfunction output', colour='blue', ncols=config.max_ncols)
+        if backend not in ('thread', 'process', 'async', 'serial'):
+            raise ValueError(f'Unsupported output backend: {backend}')
+        if not jobs:
+            # 只有流式函数时不启动线程池和进度条
+            results = []
+        elif backend == 'serial':
+            results = list(tqdm(map(_write_function_file, jobs), **progress))
+        elif backend == 'thread':
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                results = list(tqdm(executor.map(_write_function_file, jobs), **progress))
+        elif backend == 'process':
+            with ProcessPoolExecutor(max_workers=num_threads) as executor:
+                results = list(tqdm(executor.map(_write_function_file, jobs, chunksize=max(1, len(jobs) // (num_threads * 4))), **progress))
+        else:
+            results = asyncio.run(_write_function_files_async(jobs, num_threads, progress))
+
+        for key, (size, digest, written) in zip(names, results):
+            stats.bytes += size
+            stats.skipped += not written
+            manifest[key] = digest
+
+        if prune:
+            # 删除上次导出过但这次不再存在的函数文件
+            for key in old_manifest.keys() - manifest.keys():
+                function_path = self.get_function_path(key.split(':', 1)[1])
+                if os.path.exists(function_path):
+                    os.remove(function_path)
+                    stats.deleted += 1
+
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        _write_atomic(self.manifest_path, json.dumps({'version': 1, 'functions': manifest}, indent=1).encode('utf-8'))
+        stats.seconds = time.perf_counter() - start
+        self._output_state = self._function_state()
+        print(stats)
+        return stats
+
+    def _function_state(self) -> List[Tuple[int, int]]:
+        return [(id(function), function.command_count) for function in self.function_list]
+
+    @property
+    def has_pending_output(self) -> bool:
+        """
+        Whether functions were added or changed since the last output().
+        """
+        return bool(self.function_list) and self._function_state() != self._output_state
 
     def __del__(self):
-        self.output()
+        # 已经导出过的Save不再重复导出，解释器退出时由_output_at_exit负责
+        if getattr(self, 'function_list', None) is not None and self.has_pending_output:
+            self.output()
 
 
 class ResourcePack(object):
@@ -80,7 +322,7 @@ class ResourcePack(object):
 
     def add_texture_block(
             self,
-            image: str | Image.Image,
+            image: 'str | Image.Image',
             path: str,
             emissive: bool = False
     ):
@@ -96,6 +338,7 @@ class ResourcePack(object):
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
         if isinstance(image, str):
+            from PIL import Image
             image = Image.open(image)
         image.save(file_path)
 
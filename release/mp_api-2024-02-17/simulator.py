@@ -0,0 +1,410 @@
+import heapq
+import os
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .event import MCFunction
+
+if TYPE_CHECKING:
+    from .save import Save
+
+# Ticks per unit of 'schedule' times
+_time_units = {'t': 1, 's': 20, 'd': 24000}
+
+# Sub-commands of 'execute', arguments up to the next one are skipped and conditions other than scores pass
+_execute_keywords = {'align', 'anchored', 'as', 'at', 'facing', 'if', 'in', 'on', 'positioned', 'rotated', 'run',
+                     'store', 'summon', 'unless'}
+
+
+def _read_function_file(path: str) -> List[str]:
+    """Read the commands of a .mcfunction file, blank lines and comments are dropped.
+
+    Args:
+        path (str): The file.
+
+    Returns:
+        List[str]: The commands.
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [line.lstrip('/') for line in lines if line and not line.startswith('#')]
+
+
+def _full_name(name: str) -> str:
+    return name if ':' in name else f'minecraft:{name}'
+
+
+def _in_range(value: int, text: str) -> bool:
+    """Check a score against a 'matches' range such as '3', '..5', '2..' or '2..5'."""
+    low, dots, high = text.partition('..')
+    if not dots:
+        return value == int(low)
+    return (not low or value >= int(low)) and (not high or value <= int(high))
+
+
+def particle_count(tokens: List[str]) -> int:
+    """Get the number of particles spawned by a tokenized particle command.
+
+    The descriptor can contain spaces, so the count is read from the end of the command,
+    after the optional player and force mode. A count of 0 spawns one particle.
+
+    Args:
+        tokens (List[str]): The command split on whitespace, starting with 'particle'.
+
+    Returns:
+        int: The number of particles, at least 1.
+    """
+    end = len(tokens)
+    if end > 2 and not _is_number(tokens[end - 1]) and tokens[end - 1] not in ('force', 'normal'):
+        end -= 1
+    if end > 2 and tokens[end - 1] in ('force', 'normal'):
+        end -= 1
+    try:
+        return max(int(tokens[end - 1]), 1)
+    except ValueError:
+        return 1
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _axis_size(a: str, b: str) -> int:
+    """Get the number of blocks between two coordinates of a fill, 1 if they are not comparable."""
+    prefix_a, prefix_b = a[:1] if a[:1] in '~^' else '', b[:1] if b[:1] in '~^' else ''
+    if prefix_a != prefix_b:
+        return 1
+    try:
+        return abs(int(float(a[len(prefix_a):] or 0)) - int(float(b[len(prefix_b):] or 0))) + 1
+    except ValueError:
+        return 1
+
+
+class SimulationReport(object):
+    def __init__(self):
+        """Initialize an empty SimulationReport, filled by Simulator.run.
+
+        Per-tick values are indexed by tick, a tick without any executed function counts 0.
+        """
+        self._commands: Dict[int, int] = {}
+        self._particles: Dict[int, int] = {}
+        self._blocks: Dict[int, int] = {}
+        self.function_calls: Dict[str, int] = {}
+        self.call_graph: Dict[str, Dict[str, int]] = {}
+        self.schedule_graph: Dict[str, Dict[str, int]] = {}
+        self.truncated_ticks: List[int] = []
+        self.unknown_functions: Dict[str, int] = {}
+
+    def __str__(self) -> str:
+        """Return a summary of the report."""
+        return f'Ticks: {self.ticks}, Commands: {self.total_commands}, Particles: {self.total_particles}, ' \
+               f'Peak tick: {self.peak_tick} ({self.peak_commands} commands), Functions: {len(self.function_calls)}, ' \
+               f'Truncated ticks: {len(self.truncated_ticks)}'
+
+    def _array(self, values: Dict[int, int]) -> np.ndarray:
+        array = np.zeros(self.ticks, dtype=np.int64)
+        if values:
+            array[np.fromiter(values.keys(), dtype=np.int64)] = np.fromiter(values.values(), dtype=np.int64)
+        return array
+
+    @property
+    def ticks(self) -> int:
+        """Get the number of simulated ticks, from tick 0 to the last tick that ran a command."""
+        return max(self._commands) + 1 if self._commands else 0
+
+    @property
+    def commands_per_tick(self) -> np.ndarray:
+        """Get the number of executed commands of every tick.
+
+        Returns:
+            np.ndarray: Array of shape (ticks,).
+        """
+        return self._array(self._commands)
+
+    @property
+    def particles_per_tick(self) -> np.ndarray:
+        """Get the number of spawned particles of every tick.
+
+        Returns:
+            np.ndarray: Array of shape (ticks,).
+        """
+        return self._array(self._particles)
+
+    @property
+    def blocks_per_tick(self) -> np.ndarray:
+        """Get the number of blocks placed by setblock and fill in every tick.
+
+        Returns:
+            np.ndarray: Array of shape (ticks,).
+        """
+        return self._array(self._blocks)
+
+    @property
+    def total_commands(self) -> int:
+        """Get the number of executed commands."""
+        return sum(self._commands.values())
+
+    @property
+    def total_particles(self) -> int:
+        """Get the number of spawned particles."""
+        return sum(self._particles.values())
+
+    @property
+    def peak_tick(self) -> int | None:
+        """Get the tick with the most executed commands, the first one on a tie."""
+        return min(self._commands, key=lambda t: (-self._commands[t], t)) if self._commands else None
+
+    @property
+    def peak_commands(self) -> int:
+        """Get the number of commands executed in the peak tick."""
+        return self._commands[self.peak_tick] if self._commands else 0
+
+
+class Simulator(object):
+    def __init__(self, functions: Dict[str, List[str]], max_command_chain_length: int = 65536):
+        """Initialize a Simulator, an offline interpreter for the commands generated by this package.
+
+        Supported are 'function', 'schedule function/clear', 'execute ... run' with 'if/unless score'
+        conditions, 'scoreboard players' and 'scoreboard objectives', 'particle', 'setblock' and 'fill'.
+        Other commands only count as executed, other execute conditions are assumed to pass and
+        execute runs once whatever the number of selected entities.
+
+        Args:
+            functions (Dict[str, List[str]]): Commands of every function, keyed by 'namespace:name'.
+            max_command_chain_length (int, optional): Commands a function started by the tick loop may
+                run, including nested calls, the rest of the chain is dropped (65536 by default,
+                the gamerule default).
+        """
+        self.functions = functions
+        self.max_command_chain_length = max_command_chain_length
+        self.scores: Dict[Tuple[str, str], int] = {}
+        self.objectives = set()
+        self.tick = 0
+        self.report = SimulationReport()
+        self._scheduled: List[Tuple[int, int, str, int]] = []
+        self._generation: Dict[str, int] = {}
+        self._sequence = 0
+
+    @staticmethod
+    def from_datapack(path: str) -> 'Simulator':
+        """Load every function of a datapack, e.g. one written by Save.output.
+
+        Args:
+            path (str): The datapack directory, containing 'data'.
+
+        Returns:
+            Simulator: The simulator.
+        """
+        functions = {}
+        data = os.path.join(path, 'data')
+        for namespace in sorted(os.listdir(data)):
+            for folder in ('functions', 'function'):
+                root = os.path.join(data, namespace, folder)
+                for directory, _, files in os.walk(root):
+                    for file in files:
+                        if file.endswith('.mcfunction'):
+                            name = os.path.relpath(os.path.join(directory, file), root)[:-len('.mcfunction')]
+                            functions[f"{namespace}:{name.replace(os.sep, '/')}"] = \
+                                _read_function_file(os.path.join(directory, file))
+        return Simulator(functions)
+
+    @staticmethod
+    def from_save(save: 'Save') -> 'Simulator':
+        """Load the datapack of a Save after Save.output.
+
+        Args:
+            save (Save): The save.
+
+        Returns:
+            Simulator: The simulator.
+        """
+        return Simulator.from_datapack(os.path.join(save.path, 'datapacks', save.datapack))
+
+    @staticmethod
+    def from_functions(functions: Iterable[MCFunction]) -> 'Simulator':
+        """Load MCFunctions, streamed functions are read back from their file, so they must be closed.
+
+        Args:
+            functions (Iterable[MCFunction]): The functions, with a namespace.
+
+        Returns:
+            Simulator: The simulator.
+        """
+        return Simulator({
+            f'{f.namespace}:{f.name}': _read_function_file(f.sink.path) if f.sink is not None else list(f.commands)
+            for f in functions
+        })
+
+    def get_score(self, holder: str, objective: str) -> int:
+        """Get a score, 0 if it was never set."""
+        return self.scores.get((holder, objective), 0)
+
+    def set_score(self, holder: str, objective: str, value: int):
+        """Set a score."""
+        self.scores[(holder, objective)] = value
+
+    def schedule(self, name: str, delay: int, append: bool = False):
+        """Schedule a function like 'schedule function', replacing its pending runs unless append is True.
+
+        Args:
+            name (str): The function, 'namespace:name'.
+            delay (int): Delay in ticks, at least 1.
+            append (bool, optional): Keep the pending runs of the function (False by default).
+        """
+        name = _full_name(name)
+        if not append:
+            self._generation[name] = self._generation.get(name, 0) + 1
+        self._sequence += 1
+        heapq.heappush(self._scheduled, (self.tick + max(delay, 1), self._sequence, name, self._generation.get(name, 0)))
+
+    def call(self, name: str) -> int:
+        """Run a function now, in the current tick, with its own command chain budget.
+
+        Args:
+            name (str): The function, 'namespace:name'.
+
+        Returns:
+            int: Number of commands executed, including nested calls.
+        """
+        name = _full_name(name)
+        report = self.report
+        budget = self.max_command_chain_length
+        count = particles = blocks = 0
+        stack = [(name, iter(self._enter(name, None)))]
+        while stack:
+            current, commands = stack[-1]
+            command = next(commands, None)
+            if command is None:
+                stack.pop()
+                continue
+            if count >= budget:
+                report.truncated_ticks.append(self.tick)
+                break
+            count += 1
+            tokens = self._resolve(command.split())
+            if not tokens:
+                continue
+            head = tokens[0]
+            if head == 'function':
+                callee = _full_name(tokens[1])
+                stack.append((callee, iter(self._enter(callee, current))))
+            elif head == 'particle':
+                particles += particle_count(tokens)
+            elif head == 'setblock':
+                blocks += 1
+            elif head == 'fill' and len(tokens) >= 7:
+                blocks += _axis_size(tokens[1], tokens[4]) * _axis_size(tokens[2], tokens[5]) * _axis_size(tokens[3], tokens[6])
+            elif head == 'schedule':
+                self._schedule_command(tokens, current)
+            elif head == 'scoreboard':
+                self._scoreboard_command(tokens)
+
+        for values, value in ((report._commands, count), (report._particles, particles), (report._blocks, blocks)):
+            if value:
+                values[self.tick] = values.get(self.tick, 0) + value
+        return count
+
+    def run(self, entry: str | Iterable[str], max_ticks: int = 1000000) -> SimulationReport:
+        """Run entry functions at tick 0, then scheduled functions tick by tick until nothing is scheduled.
+
+        Args:
+            entry (str | Iterable[str]): The function(s) to start, e.g. a timeline's '<namespace>:<name>/start'.
+            max_ticks (int, optional): Stop before this tick, for functions that reschedule forever (1000000 by default).
+
+        Returns:
+            SimulationReport: The report, also kept as self.report.
+        """
+        self.tick = 0
+        self.report = SimulationReport()
+        self._scheduled = []
+        self._generation = {}
+        for name in [entry] if isinstance(entry, str) else entry:
+            self.call(name)
+        while self._scheduled and self._scheduled[0][0] < max_ticks:
+            self.tick, _, name, generation = heapq.heappop(self._scheduled)
+            if generation == self._generation.get(name, 0):
+                self.call(name)
+        return self.report
+
+    def _enter(self, name: str, caller: str | None) -> List[str]:
+        report = self.report
+        if caller is not None:
+            edges = report.call_graph.setdefault(caller, {})
+            edges[name] = edges.get(name, 0) + 1
+        if name not in self.functions:
+            report.unknown_functions[name] = report.unknown_functions.get(name, 0) + 1
+            return []
+        report.function_calls[name] = report.function_calls.get(name, 0) + 1
+        return self.functions[name]
+
+    def _resolve(self, tokens: List[str]) -> List[str]:
+        """Reduce an 'execute' command to the command it runs, an empty list if a condition fails."""
+        while tokens and tokens[0] == 'execute':
+            i = 1
+            while i < len(tokens) and tokens[i] != 'run':
+                if tokens[i] in ('if', 'unless') and i + 1 < len(tokens) and tokens[i + 1] == 'score':
+                    expected = tokens[i] == 'if'
+                    passed, i = self._score_condition(tokens, i + 2)
+                    if passed != expected:
+                        return []
+                    continue
+                i += 1
+                while i < len(tokens) and tokens[i] not in _execute_keywords:
+                    i += 1
+            tokens = tokens[i + 1:]
+        return tokens
+
+    def _score_condition(self, tokens: List[str], i: int) -> Tuple[bool, int]:
+        """Evaluate 'score <holder> <objective> matches <range>' or '... <op> <holder> <objective>' at tokens[i].
+
+        Returns:
+            Tuple[bool, int]: Whether the score condition holds, and the index after it.
+        """
+        value = self.get_score(tokens[i], tokens[i + 1])
+        if tokens[i + 2] == 'matches':
+            return _in_range(value, tokens[i + 3]), i + 4
+        other = self.get_score(tokens[i + 3], tokens[i + 4])
+        op = tokens[i + 2]
+        passed = {'<': value < other, '<=': value <= other, '=': value == other,
+                  '>=': value >= other, '>': value > other}.get(op, False)
+        return passed, i + 5
+
+    def _schedule_command(self, tokens: List[str], caller: str):
+        if len(tokens) >= 3 and tokens[1] == 'clear':
+            name = _full_name(tokens[2])
+            self._generation[name] = self._generation.get(name, 0) + 1
+        elif len(tokens) >= 4 and tokens[1] == 'function':
+            time = tokens[3]
+            unit = _time_units.get(time[-1:])
+            delay = round(float(time[:-1] if unit else time) * (unit or 1))
+            name = _full_name(tokens[2])
+            self.schedule(name, delay, append=len(tokens) > 4 and tokens[4] == 'append')
+            edges = self.report.schedule_graph.setdefault(caller, {})
+            edges[name] = edges.get(name, 0) + 1
+
+    def _scoreboard_command(self, tokens: List[str]):
+        if len(tokens) >= 4 and tokens[1] == 'objectives' and tokens[2] == 'add':
+            self.objectives.add(tokens[3])
+        elif len(tokens) >= 5 and tokens[1] == 'players':
+            action, key = tokens[2], (tokens[3], tokens[4])
+            if action == 'reset':
+                self.scores.pop(key, None)
+            elif action in ('set', 'add', 'remove') and len(tokens) >= 6:
+                value = int(tokens[5])
+                old = self.scores.get(key, 0)
+                self.scores[key] = value if action == 'set' else old + value if action == 'add' else old - value
+            elif action == 'operation' and len(tokens) >= 8:
+                a, b = self.scores.get(key, 0), self.get_score(tokens[6], tokens[7])
+                op = tokens[5]
+                if op == '><':
+                    self.scores[key], self.scores[(tokens[6], tokens[7])] = b, a
+                    return
+                result = {'=': b, '+=': a + b, '-=': a - b, '*=': a * b, '<': min(a, b), '>': max(a, b),
+                          '/=': a // b if b else a, '%=': a % b if b else a}.get(op)
+                if result is not None:
+                    self.scores[key] = result
@@ -0,0 +1,133 @@
+import functools
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, List, Tuple
+
+from . import config
+
+
+@functools.lru_cache(maxsize=None)
+def _file_mode() -> int:
+    # umask只能通过设置来读取，只在第一次调用时读取一次
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def make_temp_file(directory: str) -> Tuple[int, str]:
+    """Create a temporary file in directory with the permissions open() would give a new file.
+
+    tempfile.mkstemp creates files readable by the owner only and os.replace keeps that mode,
+    so the mode is widened to 0o666 minus the umask before the file is renamed into place.
+
+    Args:
+        directory (str): The directory of the file.
+
+    Returns:
+        Tuple[int, str]: The open file descriptor and the path of the file.
+    """
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        os.chmod(path, _file_mode())
+    except BaseException:
+        os.close(fd)
+        os.remove(path)
+        raise
+    return fd, path
+
+
+class BufferedFileSink(object):
+    def __init__(self, path: str, buffer_size: int = config.stream_buffer_size):
+        """Initialize a BufferedFileSink.
+
+        Lines are kept in memory until `buffer_size` of them are pending, then written
+        in one chunk to a temporary file next to `path`, which is renamed into place on close.
+
+        Args:
+            path (str): The file to write.
+            buffer_size (int, optional): Number of lines buffered before flushing.
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer: List[str] = []
+        self.line_count = 0
+        self.bytes_written = 0
+        self.closed = False
+        self._file: BinaryIO | None = None
+        self._tmp_path: str | None = None
+        self._written = False
+        self._hash = hashlib.blake2b(digest_size=16)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, self._tmp_path = make_temp_file(os.path.dirname(self.path))
+        self._file = os.fdopen(fd, 'wb')
+
+    def _write(self, text: str):
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._hash.update(data)
+        self.bytes_written += len(data)
+
+    @property
+    def digest(self) -> str:
+        """Get the hash of the bytes written so far.
+
+        Returns:
+            str: The hex digest.
+        """
+        return self._hash.hexdigest()
+
+    def write(self, *lines: str):
+        """Append lines to the sink, flushing when the buffer is full.
+
+        Args:
+            *lines (str): Lines to write, without trailing newlines.
+        """
+        if self.closed:
+            raise ValueError(f'Sink {self.path} is closed')
+        self.buffer.extend(lines)
+        self.line_count += len(lines)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered lines to the file."""
+        if not self.buffer:
+            return
+        if self._file is None:
+            self._open()
+        # 与'\n'.join(commands)的输出保持一致，文件末尾不带换行
+        if self._written:
+            self._write('\n')
+        self._write('\n'.join(self.buffer))
+        self._written = True
+        self.buffer.clear()
+
+    def close(self, old_digest: str | None = None) -> bool:
+        """Flush the remaining lines, close the file and move it into place. Calling it again does nothing.
+
+        Args:
+            old_digest (str | None, optional): Digest of the file at `path` from the last export. If it
+                matches and the size agrees, the file is left untouched and the temporary file is removed.
+
+        Returns:
+            bool: Whether the file was replaced.
+        """
+        if self.closed:
+            return False
+        self.flush()
+        if self._file is None:
+            self._open()
+        self._file.close()
+        self.closed = True
+        if self.digest == old_digest and os.path.exists(self.path) and os.path.getsize(self.path) == self.bytes_written:
+            os.remove(self._tmp_path)
+            return False
+        os.replace(self._tmp_path, self.path)
+        return True
+
+    def __str__(self) -> str:
+        """Return a string representation of the BufferedFileSink."""
+        return f"<BufferedFileSink {self.path}>"
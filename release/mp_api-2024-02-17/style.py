@@ -1,38 +1,71 @@
 import math
 import random
-from typing import Callable, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
+from typing import List, Tuple
 
 import numpy as np
 
-from . import func2math_exp
+from .utils import ExprTemplate, func2math_exp, mp_clamp, mp_cos, mp_sin
 from .mp_typing import T_Pos
 from .particle_line import ParticleLine, arc22pl
-from .mp_math import Arc2, Point2, Point3, Segment2, T_Num
+from .mp_math import Arc2, Arc2Array, Point2, Point3, Point3List, T_Num
 
 
-def points_2_group(points: List[Point3]) -> List[List[Point3]]:
+def _points_array(points: List[Point3] | Point3List | np.ndarray) -> np.ndarray:
     """
-    把x相同的点分为一组列表储存，且列表内按z排序，整数坐标自动加上0.5
+    把Point3列表、Point3List或数组转换为形状为(N, 3)的数组，数组输入不复制
+    """
+    if isinstance(points, (np.ndarray, Point3List)):
+        return np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    return np.stack([np.fromiter(map(attrgetter(axis), points), np.float64, len(points)) for axis in 'xyz'], axis=-1)
+
+
+def _to_points(array: np.ndarray) -> List[Point3]:
+    """
+    把形状为(N, 3)的数组转换为Point3列表，需要惰性视图时用Point3List包装*_array的结果
+    """
+    return [Point3(x, y, z) for x, y, z in array.tolist()]
+
+
+def _group_order(points: List[Point3] | np.ndarray, tolerance: T_Num = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    一次lexsort按x、z排序，再用np.unique在x变化处切分
+    :return: 排序后的(N, 3)数组，长度为组数+1的每组起始偏移，以及排序所用的下标
+    """
+    array = np.array(_points_array(points))
+    if tolerance > 0:
+        array[:, 0] = np.round(array[:, 0] / tolerance) * tolerance
+    order = np.lexsort((array[:, 2], array[:, 0]))
+    array = array[order]
+    _, index = np.unique(array[:, 0], return_index=True)
+    return array, np.append(index, len(array)), order
+
+
+def points_2_group_array(points: List[Point3] | np.ndarray, tolerance: T_Num = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    points_2_group 的数组版本，所有组连续存放在一个数组里，可直接传给Soma
+    :param points: Point3列表，或形状为(N, 3)的x, y, z数组
+    :param tolerance: 大于0时先把x吸附到该间距的网格上，避免浮点误差把同一时刻的点分到不同组
+    :return: 按x分组、组内按z排序的(N, 3)数组，以及长度为组数+1的偏移，第i组为array[offsets[i]:offsets[i + 1]]
+    """
+    array, offsets, _ = _group_order(points, tolerance)
+    return array, offsets
+
+
+def points_2_group(points: List[Point3], tolerance: T_Num = 0) -> List[List[Point3]]:
+    """
+    把x相同的点分为一组列表储存，且列表内按z排序，不修改传入的列表
     :param points:
+    :param tolerance: 大于0时先把x吸附到该间距的网格上，此时返回x吸附后的新点
     :return:
     """
-    point_groups = []
-    points.sort(key=lambda x: x.x)
-    # 先分组
-    for point in points:
-        if len(point_groups) == 0:
-            point_groups.append([point])
-        else:
-            if point_groups[-1][0].x == point.x:
-                point_groups[-1].append(point)
-            else:
-                point_groups.append([point])
-    # 按照x排序列表
-    point_groups.sort(key=lambda x: x[0].x)
-    # 按照z排序列表中的点
-    for group in point_groups:
-        group.sort(key=lambda x: x.z)
-    return point_groups
+    array, offsets, order = _group_order(points, tolerance)
+    if tolerance > 0:
+        points = [Point3(x, points[i].y, points[i].z, points[i].t) for i, x in zip(order.tolist(), array[:, 0].tolist())]
+    else:
+        points = [points[i] for i in order.tolist()]
+    return [points[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
 
 
 def connect_points(start_num: int,
@@ -53,71 +86,167 @@ def connect_points(start_num: int,
     return connections
 
 
+def _connect_index(offsets: np.ndarray) -> np.ndarray:
+    """
+    connect_points 的数组版本，一次算出所有列的连接
+    除第一组外每个点都恰好是一条连接的终点，且终点按顺序排列，所以只返回每个终点对应的起点序号
+    :param offsets: 每组起始偏移，长度为组数+1
+    :return: 长度为N-第一组点数的起点序号
+    """
+    sizes = np.diff(offsets)
+    start_num = np.repeat(sizes[:-1], sizes[1:])
+    end_num = np.repeat(sizes[1:], sizes[1:])
+    start_offset = np.repeat(offsets[:-2], sizes[1:])
+    j = np.arange(offsets[1], offsets[-1]) - np.repeat(offsets[1:-1], sizes[1:])
+    # 起点少于终点时，前remainder个起点各连each_num+1个终点，其余各连each_num个
+    each_num, remainder = np.divmod(end_num, start_num)
+    each_num = np.maximum(each_num, 1)
+    head = remainder * (each_num + 1)
+    spread = np.where(j < head, j // (each_num + 1), remainder + (j - head) // each_num)
+    return start_offset + np.where(start_num >= end_num, j, spread)
+
+
+def _groups_to_arrays(point_groups: List[List[Point3]] | Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把点组展开为形状为(N, 3)的x, y, z数组，以及长度为组数+1的每组起始偏移，points_2_group_array的结果原样返回
+    """
+    if isinstance(point_groups, tuple):
+        return point_groups
+    offsets = np.cumsum([0] + [len(group) for group in point_groups])
+    points = np.array([(p.x, p.y, p.z) for group in point_groups for p in group], dtype=np.float64).reshape(-1, 3)
+    return points, offsets
+
+
+def _tree_prefix_sum(parent: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    沿父节点链求前缀和，parent为-1的是根，返回每个节点到根路径上values之和
+    使用指针跳跃，只需要log2(树深度)轮数组运算
+    """
+    n = len(values)
+    total = np.append(np.asarray(values, dtype=np.float64), 0)
+    jump = np.append(np.where(parent < 0, n, parent), n)
+    while (jump[:n] != n).any():
+        total = total + total[jump]
+        jump = jump[jump]
+    return total[:n]
+
+
+def _tree_nearest(parent: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    求每个节点最近的已标记祖先(含自身)的值，values为nan表示未标记，没有已标记祖先时为0
+    同样使用指针跳跃，未解决的节点与其跳转目标之间始终没有已标记节点
+    """
+    n = len(values)
+    nearest = np.append(np.asarray(values, dtype=np.float64), 0)
+    jump = np.append(np.where(parent < 0, n, parent), n)
+    while np.isnan(nearest).any():
+        nearest = np.where(np.isnan(nearest), nearest[jump], nearest)
+        jump = jump[jump]
+    return nearest[:n]
+
+
+def _soma3_arrays(points: np.ndarray, offsets: np.ndarray) -> Tuple[Arc2Array, np.ndarray]:
+    """
+    一次性求解整条soma3，不逐列循环
+    圆弧两端的切线关于弦对称，所以终点切线角 = 2 * 弦角 - 起点切线角，
+    沿连接树做交错前缀和就能得到每个点的切线，再由切线和弦直接算出圆心与转向
+    :param points: 形状为(N, 3)的点组数组，见_groups_to_arrays
+    :param offsets: 每组起始偏移
+    :return: 所有圆弧组成的Arc2Array，以及形状为(K, 2)的起止点y坐标
+    """
+    if len(offsets) < 3:
+        return Arc2Array(np.empty((0, 2)), np.empty((0, 2)), np.empty((0, 2)), np.empty(0)), np.empty((0, 2))
+    n0 = offsets[1]
+    xz = points[:, [0, 2]]
+    start_index = _connect_index(offsets)
+    s, e = xz[start_index], xz[n0:]
+    chord = e - s
+    chord_angle = np.arctan2(chord[:, 1], chord[:, 0])
+
+    # 第一组的假圆弧在点上沿+x方向结束，切线角为0；之后每个点的切线角为 sign * psi
+    sign = 1 - 2 * (np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)) % 2)
+    parent = np.concatenate([np.full(n0, -1), start_index])
+    psi = _tree_prefix_sum(parent, np.concatenate([np.zeros(n0), 2 * sign[n0:] * chord_angle]))
+    tangent = sign * psi
+    straight = np.abs(np.sin(chord_angle - tangent[start_index])) <= 1e-9
+
+    # 与切线反向的直线(尖点)之后沿直线方向继续，等价于其后代的切线都转过pi，
+    # 转过的奇偶性就是最近的直线祖先自身是否反向
+    reverse = straight & (np.cos(chord_angle - tangent[start_index]) < 0)
+    if reverse.any():
+        marked = np.concatenate([np.full(n0, np.nan), np.where(straight, reverse, np.nan)])
+        tangent = tangent + math.pi * _tree_nearest(parent, marked)
+    tangent = tangent[start_index]
+
+    # 弦在切线左侧为逆时针；弦与切线平行时为直线
+    cross = np.sin(chord_angle - tangent)
+    normal = np.stack([-np.sin(tangent), np.cos(tangent)], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centers = s + normal * (np.hypot(chord[:, 0], chord[:, 1]) / (2 * cross))[:, None]
+    centers[straight] = np.nan
+    directions = np.where(cross > 0, 1.0, -1.0)
+
+    ys = np.stack([points[start_index, 1], points[n0:, 1]], axis=-1)
+    return Arc2Array(centers, s, e, directions), ys
+
+
 # 进行一个🐟的摸，稍等
 class Soma:
     @staticmethod
-    def soma3_2d(point_groups: List[List[Point3]]) -> List[ParticleLine]:
+    def soma3_2d(point_groups: List[List[Point3]] | Tuple[np.ndarray, np.ndarray]) -> List[ParticleLine]:
         """
         计算平面soma3，返回带有ParticleLine的列表，建议自行添加起始点以便美观
         Soma3曲线在两个点之间用圆弧连接，且两个点处的切线方向相同
-        :param point_groups: 处理后的点组
+        :param point_groups: 处理后的点组，或points_2_group_array返回的(数组, 偏移)
         :return:
         """
+        arcs, ys = Soma.soma3_2d_arcs(point_groups)
         lines = []
-        # 起始线
-        last_arc_list = []
-        # 制造假圆弧
-        for p in point_groups[0]:
-            cp = Point2(p.x, p.z - 1)
-            sp = Point2(p.x - 1, p.z - 1)
-            ep = p.point2mc
-            last_arc_list.append(Arc2(cp, sp, ep, -1))
-        for i, start_group, end_group in zip(range(len(point_groups[:-1])), point_groups[:-1], point_groups[1:]):
-            start_num = len(start_group)
-            end_num = len(end_group)
-            connections = connect_points(start_num, end_num)
-
-            this_arc_list: List[Arc2] = []  # 本次的Arc临时列表
-            for conn in connections:
-                # 两点连接域
-                startp2: Point2 = start_group[conn[0]].point2mc
-                endp2: Point2 = end_group[conn[1]].point2mc
-                path_seg = Segment2(startp2, endp2)  # 位移线段
-                last_arc = last_arc_list[conn[0]]
-                if last_arc.center is None:
-                    # 上一个弧是假弧的特殊情况
-
-                    last_path_seg = Segment2(last_arc.start, last_arc.end)
-                    zero_line = last_path_seg.line.get_perpendicular_line(last_arc.end)
-                    center = zero_line.get_intersection(path_seg.perpendicular_bisector)  # 圆心
-                    croter_line = Segment2(startp2, center).line
-                    v1 = center.get_vector2(startp2)
-                else:
-                    croter_line = Segment2(last_arc.center, last_arc.get_pos(1.0)).line  # 末向量/穿心线段/判定线段(建议用向量夹角判断，不要用点在线上，会出现精度错误)
-                    v1 = startp2.get_vector2(last_arc.center)
-
-                if croter_line.is_parallel(path_seg.perpendicular_bisector):
-                    center = None
-                else:
-                    center = croter_line.get_intersection(path_seg.perpendicular_bisector)
-
-                v2 = startp2.get_vector2(endp2)
-
-                if v1.get_angle(v2) > math.pi / 2:
-                    dire = -1 * last_arc.direction
-                elif v1.get_angle(v2) == math.pi / 2:
-                    dire = last_arc.direction
-                else:
-                    dire = last_arc.direction
-
-                arc2 = Arc2(center, startp2, endp2, dire)  # 生成Arc2
-                this_arc_list.append(arc2)  # 加入本次的Arc临时列表
-
-                particle_line = arc22pl(arc2, lambda t: start_group[conn[0]].y + (end_group[conn[1]].y - start_group[conn[0]].y) * t)
-                lines.append(particle_line)
-            last_arc_list = this_arc_list
+        for center, start, end, direction, (y0, y1) in zip(arcs.centers.tolist(), arcs.starts.tolist(), arcs.ends.tolist(),
+                                                           arcs.directions.tolist(), ys.tolist()):
+            arc2 = Arc2(Point2(*center) if center[0] == center[0] else None, Point2(*start), Point2(*end), direction)
+            lines.append(arc22pl(arc2, lambda t, y0=y0, y1=y1: y0 + (y1 - y0) * t))
         return lines
 
+    @staticmethod
+    def soma3_2d_arcs(point_groups: List[List[Point3]] | Tuple[np.ndarray, np.ndarray]) -> Tuple[Arc2Array, np.ndarray]:
+        """
+        计算平面soma3，返回所有圆弧组成的Arc2Array，以及形状为(N, 2)的起止点y坐标
+        :param point_groups: 处理后的点组，或points_2_group_array返回的(数组, 偏移)
+        :return:
+        """
+        return _soma3_arrays(*_groups_to_arrays(point_groups))
+
+    @staticmethod
+    def soma3_2d_tracks(tracks: List[List[List[Point3]] | Tuple[np.ndarray, np.ndarray]],
+                        workers: int = 1
+                        ) -> List[Tuple[Arc2Array, np.ndarray]]:
+        """
+        计算多条互不相关的soma3轨道(如MIDI的各个音轨)，workers大于1时分给进程池并行计算
+        :param tracks: 每条轨道处理后的点组，或points_2_group_array的结果
+        :param workers: 进程数
+        :return: 每条轨道的soma3_2d_arcs结果
+        """
+        arrays = [_groups_to_arrays(point_groups) for point_groups in tracks]
+        if workers > 1 and len(arrays) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(_soma3_arrays, *zip(*arrays)))
+        return [_soma3_arrays(points, offsets) for points, offsets in arrays]
+
+    @staticmethod
+    def soma3_2d_pos(point_groups: List[List[Point3]] | Tuple[np.ndarray, np.ndarray], p: T_Num | np.ndarray) -> np.ndarray:
+        """
+        一次性计算所有soma3轨迹在进度p处的三维坐标，y在起止点之间线性变化
+        :param point_groups: 处理后的点组，或points_2_group_array返回的(数组, 偏移)
+        :param p: 进度，(M,)为所有轨迹共用，(N, M)为每条轨迹单独的进度
+        :return: 形状为(N, M, 3)的坐标
+        """
+        arcs, ys = Soma.soma3_2d_arcs(point_groups)
+        p = np.asarray(p, dtype=np.float64).reshape(1, -1) if np.ndim(p) <= 1 else np.asarray(p, dtype=np.float64)
+        xz = arcs.get_pos(p)
+        y = ys[:, :1] + (ys[:, 1:] - ys[:, :1]) * p
+        return np.stack([xz[..., 0], y, xz[..., 1]], axis=-1)
+
     @staticmethod
     def line_3d(point_groups: List[List[Point3]]) -> List[ParticleLine]:
         """
@@ -136,9 +265,9 @@ class Soma:
                 particle_line = ParticleLine(
                     start_time=startp3.x,
                     end_time=endp3.x,
-                    x_fun=lambda p, sx=startp3.x, ex=endp3.x: sx + (ex - sx) * p,
-                    y_fun=lambda p, sy=startp3.y, ey=endp3.y: sy + (ey - sy) * p,
-                    z_fun=lambda p, sz=startp3.z, ez=endp3.z: sz + (ez - sz) * p,
+                    x_fun=lambda p, sx=startp3.x, dx=endp3.x - startp3.x: sx + dx * p,
+                    y_fun=lambda p, sy=startp3.y, dy=endp3.y - startp3.y: sy + dy * p,
+                    z_fun=lambda p, sz=startp3.z, dz=endp3.z - startp3.z: sz + dz * p,
                     length=startp3.get_distance(endp3)
                 )
                 lines.append(particle_line)
@@ -148,9 +277,9 @@ class Soma:
 class Struct:
     # 这个类预定了一些形状样式的相对坐标列表
     @staticmethod
-    def cube(length: T_Num = 1, density: T_Num = 0.1, padding: str = 'p', anchor: T_Pos = (0.5, 0.5, 0.5)) -> List[Point3]:
+    def cube_array(length: T_Num = 1, density: T_Num = 0.1, padding: str = 'p', anchor: T_Pos = (0.5, 0.5, 0.5)) -> np.ndarray:
         """
-        生成正方体
+        生成正方体，返回(N, 3)坐标数组
         :param anchor: 锚点，0.5为中心，0为左/下/前，1为右/上/后
         :param length: 边长
         :param density: 密度
@@ -158,94 +287,167 @@ class Struct:
         :return:
         """
         num_per_side = int(length / density) + 1
-        points = []
-        # 以中心生成相对坐标点
-        for i in range(num_per_side):
-            for j in range(num_per_side):
-                for k in range(num_per_side):
-                    # p 仅8个顶点
-                    if padding == 'p':
-                        if (i == 0 or i == num_per_side - 1) and (j == 0 or j == num_per_side - 1) and (k == 0 or k == num_per_side - 1):
-                            points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                    # l 仅12条边缘
-                    elif padding == 'l':
-                        if (i == 0 or i == num_per_side - 1) and (j == 0 or j == num_per_side - 1) and (k == 0 or k == num_per_side - 1):
-                            points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                        elif (i == 0 or i == num_per_side - 1) and (j == 0 or j == num_per_side - 1):
-                            points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                        elif (i == 0 or i == num_per_side - 1) and (k == 0 or k == num_per_side - 1):
-                            points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                        elif (j == 0 or j == num_per_side - 1) and (k == 0 or k == num_per_side - 1):
-                            points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                    # s 仅6个表面
-                    elif padding == 's':
-                        if i == 0 or i == num_per_side - 1 or j == 0 or j == num_per_side - 1 or k == 0 or k == num_per_side - 1:
-                            points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                    elif padding == 'b':
-                        points.append(Point3(i * density - length * anchor[0], j * density - length * anchor[1], k * density - length * anchor[2]))
-                    else:
-                        raise ValueError('padding参数错误')
-        return points
+        offset = length * np.asarray(anchor, dtype=np.float64)
+        if padding == 'p':
+            # 直接构造顶点，不遍历整个立方体
+            side = np.unique([0, num_per_side - 1]) * density
+            return np.stack(np.meshgrid(side, side, side, indexing='ij'), axis=-1).reshape(-1, 3) - offset
+        elif padding == 'b':
+            axis = np.arange(num_per_side) * density
+            return np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3) - offset
+        elif padding in ('l', 's'):
+            # 每个格点所在的边界面数：>=2为边，>=1为面
+            edge = np.zeros(num_per_side, dtype=np.int8)
+            edge[[0, -1]] = 1
+            faces = edge[:, None, None] + edge[None, :, None] + edge[None, None, :]
+            return np.argwhere(faces >= (2 if padding == 'l' else 1)) * density - offset
+        else:
+            raise ValueError('padding参数错误')
 
     @staticmethod
-    def sphere_cube(radius: T_Num = 1, density: T_Num = 0.1, padding: str = 'p', anchor: T_Pos = (0, 0, 0)) -> List[Point3]:
+    def cube(length: T_Num = 1, density: T_Num = 0.1, padding: str = 'p', anchor: T_Pos = (0.5, 0.5, 0.5)) -> List[Point3]:
+        """
+        生成正方体，参数见cube_array
         """
-        生成球体
+        return _to_points(Struct.cube_array(length, density, padding, anchor))
+
+    @staticmethod
+    def sphere_cube_array(radius: T_Num = 1, density: T_Num = 0.1, padding: str = 'p', anchor: T_Pos = (0, 0, 0)) -> np.ndarray:
+        """
+        生成球体，返回(N, 3)坐标数组
         :param anchor: 锚点，0.5为中心，0为左/下/前，1为右/上/后
         :param radius: 半径
         :param density: 密度
         :param padding: 填充参数 s：仅表面，b：全部体
         :return:
         """
-        points = []
-        # 以中心生成相对坐标点
-        for i in np.arange(-radius, radius + density, density):
-            for j in np.arange(-radius, radius + density, density):
-                for k in np.arange(-radius, radius + density, density):
-                    if padding == 's':
-                        if abs(i ** 2 + j ** 2 + k ** 2 - radius ** 2) < density:
-                            points.append(Point3(i - radius * anchor[0], j - radius * anchor[1], k - radius * anchor[2]))
-                    elif padding == 'b':
-                        if i ** 2 + j ** 2 + k ** 2 <= radius ** 2:
-                            points.append(Point3(i - radius * anchor[0], j - radius * anchor[1], k - radius * anchor[2]))
-                    else:
-                        raise ValueError('padding参数错误')
-        return points
-
-    @staticmethod
-    def sphere_ave(radius: T_Num, density: T_Num, padding: str = 's'):
-        points = []
-        square = 4 * math.pi * radius ** 2
-        num = square * density
-        for i in range(num):
-            r_temp = radius
-            phi = math.acos(-1 + ((2.0 * i - 1.0) / num))
-            theta = math.sqrt(num * math.pi) * phi
-            x = r_temp * math.cos(theta) * math.sin(phi)
-            y = r_temp * math.sin(theta) * math.sin(phi)
-            z = r_temp * math.cos(phi)
-            points.append(Point3(x, y, z))
-        return points
+        axis = np.arange(-radius, radius + density, density)
+        distance2 = axis[:, None, None] ** 2 + axis[None, :, None] ** 2 + axis[None, None, :] ** 2
+        if padding == 's':
+            mask = np.abs(distance2 - radius ** 2) < density
+        elif padding == 'b':
+            mask = distance2 <= radius ** 2
+        else:
+            raise ValueError('padding参数错误')
+        return axis[np.argwhere(mask)] - radius * np.asarray(anchor, dtype=np.float64)
 
+    @staticmethod
+    def sphere_cube(radius: T_Num = 1, density: T_Num = 0.1, padding: str = 'p', anchor: T_Pos = (0, 0, 0)) -> List[Point3]:
+        """
+        生成球体，参数见sphere_cube_array
+        """
+        return _to_points(Struct.sphere_cube_array(radius, density, padding, anchor))
+
+    @staticmethod
+    def sphere_ave_array(radius: T_Num, density: T_Num, padding: str = 's') -> np.ndarray:
+        """
+        生成均匀分布的球面(斐波那契球)，返回(N, 3)坐标数组
+        :param radius: 半径
+        :param density: 单位面积内的点数
+        :param padding: 填充参数 s：仅表面
+        :return:
+        """
+        num = int(4 * math.pi * radius ** 2 * density)
+        i = np.arange(1, num + 1)
+        phi = np.arccos(-1 + (2.0 * i - 1.0) / num)
+        theta = math.sqrt(num * math.pi) * phi
+        return radius * np.stack([np.cos(theta) * np.sin(phi), np.sin(theta) * np.sin(phi), np.cos(phi)], axis=-1)
+
+    @staticmethod
+    def sphere_ave(radius: T_Num, density: T_Num, padding: str = 's') -> List[Point3]:
+        """
+        生成均匀分布的球面，参数见sphere_ave_array
+        """
+        return _to_points(Struct.sphere_ave_array(radius, density, padding))
 
 
 class Animation:
+    # 以下动画都直接生成表达式字符串，可直接传给BestParticle，单位是t，粒子执行位置统一在局部原点
 
     @staticmethod
-    def diffusion(points: List[Point3], time: T_Num) -> List[Tuple[Callable, Callable, Callable]]:
+    def diffusion(points: List[Point3] | Point3List | np.ndarray, time: T_Num,
+                  precision: int = 5) -> List[Tuple[str, str, str]]:
         """
         扩散动画，从局部原点开始扩散指目标位置，用此公式给粒子的表达式配置后，粒子执行位置可以统一在原点
-        :param points: 点列表
+        :param points: 点列表，或形状为(N, 3)的数组
         :param time: 时间
-        :return: 每个点的公式列表，单位是t
-        """
-        new_funcs = []
-        for point in points:
-            new_funcs.append(
-                (
-                        lambda t: (t / time) * point.x,
-                        lambda t: (t / time) * point.y,
-                        lambda t: (t / time) * point.z
-                )
-            )
-        return new_funcs
+        :param precision: 坐标保留的小数位数
+        :return: 每个点的x, y, z表达式，单位是t
+        """
+        array = _points_array(points)
+        template = ExprTemplate('t/{time}*{v}', precision)
+        x, y, z = (template.render_many(time=time, v=array[:, i]) for i in range(3))
+        return list(zip(x, y, z))
+
+    @staticmethod
+    def explode(points: List[Point3] | Point3List | np.ndarray, time: T_Num,
+                precision: int = 5) -> List[Tuple[str, str, str]]:
+        """
+        爆炸动画，从局部原点先快后慢地飞向目标位置，time后停在目标位置
+        :param points: 点列表，或形状为(N, 3)的数组
+        :param time: 时间
+        :param precision: 坐标保留的小数位数
+        :return: 每个点的x, y, z表达式，单位是t
+        """
+        array = _points_array(points)
+        s = mp_clamp('t/{time}', 0, 1)
+        template = ExprTemplate(f'(1 - (1 - {s})*(1 - {s}))*{{v}}', precision)
+        x, y, z = (template.render_many(time=time, v=array[:, i]) for i in range(3))
+        return list(zip(x, y, z))
+
+    @staticmethod
+    def implode(points: List[Point3] | Point3List | np.ndarray, time: T_Num,
+                precision: int = 5) -> List[Tuple[str, str, str]]:
+        """
+        内爆动画，从目标位置先慢后快地收缩到局部原点，time后停在原点
+        :param points: 点列表，或形状为(N, 3)的数组
+        :param time: 时间
+        :param precision: 坐标保留的小数位数
+        :return: 每个点的x, y, z表达式，单位是t
+        """
+        array = _points_array(points)
+        s = mp_clamp('t/{time}', 0, 1)
+        template = ExprTemplate(f'(1 - {s}*{s})*{{v}}', precision)
+        x, y, z = (template.render_many(time=time, v=array[:, i]) for i in range(3))
+        return list(zip(x, y, z))
+
+    @staticmethod
+    def swirl(points: List[Point3] | Point3List | np.ndarray, time: T_Num, turns: T_Num = 1,
+              precision: int = 5) -> List[Tuple[str, str, str]]:
+        """
+        漩涡动画，从局部原点绕y轴旋转着扩散到目标位置，time后停在目标位置
+        :param points: 点列表，或形状为(N, 3)的数组
+        :param time: 时间
+        :param turns: 旋转的圈数，负数反向旋转
+        :param precision: 坐标保留的小数位数
+        :return: 每个点的x, y, z表达式，单位是t
+        """
+        array = _points_array(points)
+        s = mp_clamp('t/{time}', 0, 1)
+        rotation = f'{{angle}}*(1 - {s})'
+        cos, sin = mp_cos(rotation), mp_sin(rotation)
+        angle = 2 * math.pi * turns
+        x = ExprTemplate(f'{s}*({{x}}*{cos} - {{z}}*{sin})', precision).render_many(time=time, angle=angle, x=array[:, 0], z=array[:, 2])
+        y = ExprTemplate(f'{s}*{{y}}', precision).render_many(time=time, y=array[:, 1])
+        z = ExprTemplate(f'{s}*({{x}}*{sin} + {{z}}*{cos})', precision).render_many(time=time, angle=angle, x=array[:, 0], z=array[:, 2])
+        return list(zip(x, y, z))
+
+    @staticmethod
+    def wave(points: List[Point3] | Point3List | np.ndarray, amplitude: T_Num, period: T_Num, wavelength: T_Num,
+             precision: int = 5) -> List[Tuple[str, str, str]]:
+        """
+        波动动画，点停在目标位置，沿y方向上下振动，振动从局部原点沿水平距离向外传播
+        :param points: 点列表，或形状为(N, 3)的数组
+        :param amplitude: 振幅
+        :param period: 周期
+        :param wavelength: 波长
+        :param precision: 坐标保留的小数位数
+        :return: 每个点的x, y, z表达式，单位是t
+        """
+        array = _points_array(points)
+        phase = 2 * math.pi * np.hypot(array[:, 0], array[:, 2]) / wavelength
+        constant = ExprTemplate('{v}', precision)
+        x, z = constant.render_many(v=array[:, 0]), constant.render_many(v=array[:, 2])
+        y = ExprTemplate('{y} + {amplitude}*' + mp_sin('{omega}*t - {phase}'), precision).render_many(
+            y=array[:, 1], amplitude=amplitude, omega=2 * math.pi / period, phase=phase)
+        return list(zip(x, y, z))
@@ -0,0 +1,240 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .event import BaseEvent, ExecuteEvent, FunctionEvent, MCFunction, ScheduleEvent
+from .mp_typing import T_Num
+
+
+def _matches(low: int, high: int) -> str:
+    return f'{low}' if low == high else f'{low}..{high}'
+
+
+def dispatch_tree(targets: Dict[int, MCFunction], name: str, objective: str, holder: str, namespace: str,
+                  fan_out: int = 2, on_function: Callable[[MCFunction], Any] = None) -> List[MCFunction]:
+    """Build a balanced search tree of dispatcher functions over a scoreboard value.
+
+    Calling the root runs targets[v] where v is the score of holder in objective. Every node tests
+    the score ranges of its fan_out children with 'execute if score ... matches a..b run function ...',
+    so one call costs about fan_out * log_fan_out(N) commands instead of N for a linear chain.
+
+    Args:
+        targets (Dict[int, MCFunction]): Score value to the function to run, the functions must have a namespace.
+        name (str): Name of the root function, inner nodes are named '<name>/<low>_<high>'.
+        objective (str): Scoreboard objective holding the value.
+        holder (str): Score holder of the value, e.g. a fake player '#tick'.
+        namespace (str): Namespace of the dispatcher functions.
+        fan_out (int, optional): Number of children of each node (2 by default).
+        on_function (Callable[[MCFunction], Any], optional): Called with every dispatcher function.
+
+    Returns:
+        List[MCFunction]: The root first, followed by the inner nodes.
+    """
+    if fan_out < 2:
+        raise ValueError(f'fan_out must be at least 2, got {fan_out}')
+    keys = sorted(targets)
+    functions: List[MCFunction] = []
+
+    def build(function: MCFunction, lo: int, hi: int):
+        if on_function is not None:
+            on_function(function)
+        functions.append(function)
+        bounds = np.linspace(lo, hi, min(fan_out, hi - lo) + 1).round().astype(np.int64).tolist()
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            low, high = keys[a], keys[b - 1]
+            if b - a == 1:
+                child = targets[low]
+            else:
+                child = MCFunction(f'{name}/{low}_{high}', namespace=namespace)
+            condition = f'if score {holder} {objective} matches {_matches(low, high)}'
+            function.add_events(ExecuteEvent([condition], FunctionEvent(child)))
+            if b - a > 1:
+                build(child, a, b)
+
+    build(MCFunction(name, namespace=namespace), 0, len(keys))
+    return functions
+
+
+class Timeline(object):
+    def __init__(self, name: str, namespace: str = None, stream: bool = False, mode: str = 'schedule',
+                 fan_out: int = 2, objective: str = 'mp_tick', holder: str = None, dedup: bool = False):
+        """Initialize a Timeline, events placed on ticks and compiled into one function per non-empty tick.
+
+        Args:
+            name (str): Prefix of the generated functions, '<name>/start' is the entry point and
+                '<name>/tick_<t>' holds the events of tick t.
+            namespace (str, optional): Namespace used in the generated function calls (None by default,
+                Save.add_timeline uses the namespace of the save).
+            stream (bool, optional): Create the tick functions in stream mode (False by default).
+            mode (str, optional): 'schedule' chains the tick functions with schedule commands, 'dispatch'
+                runs a loop that counts ticks on a scoreboard and calls the tick functions through a
+                dispatch_tree, so playback can be paused or moved by setting the score ('schedule' by default).
+            fan_out (int, optional): Fan-out of the dispatch tree (2 by default).
+            objective (str, optional): Scoreboard objective of the tick counter ('mp_tick' by default).
+            holder (str, optional): Score holder of the tick counter ('#<name>' by default).
+            dedup (bool, optional): Create the tick functions with dedup, merging the particle commands
+                of a tick that only differ in count, other commands are kept (False by default).
+        """
+        self.name = name
+        self.namespace = namespace
+        self.stream = stream
+        self.mode = mode
+        self.fan_out = fan_out
+        self.objective = objective
+        self.holder = holder or f'#{name}'
+        self.dedup = dedup
+        self._ticks: List[int] = []
+        self._events: List[BaseEvent] = []
+
+    def __len__(self) -> int:
+        """Return the number of events on the timeline."""
+        return len(self._events)
+
+    def __str__(self) -> str:
+        """Return a string representation of the Timeline."""
+        return f"<Timeline {self.name} {len(self)}>"
+
+    def add_event(self, event: BaseEvent, time: T_Num | None = None):
+        """Place an event on the timeline.
+
+        Args:
+            event (BaseEvent): The event, a ParticleEventBatch is one entry and stays batched.
+            time (T_Num | None, optional): Tick of the event, rounded to the nearest tick (event.time by default).
+        """
+        tick = round(event.time if time is None else time)
+        if tick < 0:
+            raise ValueError(f'Tick must not be negative, got {tick}')
+        self._ticks.append(tick)
+        self._events.append(event)
+
+    def add_events(self, *events: BaseEvent):
+        """Place events on the timeline at their own time.
+
+        Args:
+            *events (BaseEvent): Variable number of events to add.
+        """
+        for event in events:
+            self.add_event(event)
+
+    @property
+    def ticks(self) -> List[int]:
+        """Get the sorted non-empty ticks.
+
+        Returns:
+            List[int]: The ticks that have at least one event.
+        """
+        return np.unique(np.asarray(self._ticks, dtype=np.int64)).tolist()
+
+    def buckets(self) -> Iterator[Tuple[int, List[BaseEvent]]]:
+        """Group the events by tick with one stable sort, events of a tick keep their insertion order.
+
+        Yields:
+            Tuple[int, List[BaseEvent]]: A tick and its events, in increasing tick order.
+        """
+        ticks = np.asarray(self._ticks, dtype=np.int64)
+        order = np.argsort(ticks, kind='stable')
+        unique, index = np.unique(ticks[order], return_index=True)
+        bounds = np.append(index, len(order)).tolist()
+        order = order.tolist()
+        for i, tick in enumerate(unique.tolist()):
+            yield tick, [self._events[j] for j in order[bounds[i]:bounds[i + 1]]]
+
+    def get_function_name(self, tick: int) -> str:
+        """Get the name of the function holding the events of a tick.
+
+        Args:
+            tick (int): The tick.
+
+        Returns:
+            str: The function name, without namespace.
+        """
+        return f'{self.name}/tick_{tick}'
+
+    def compile(self, namespace: str = None, on_function: Callable[[MCFunction], Any] = None) -> List[MCFunction]:
+        """Compile the timeline into an entry point plus one function per non-empty tick.
+
+        In 'schedule' mode each tick function starts by scheduling the next non-empty tick, so empty
+        ticks cost nothing and a busy tick costs one schedule, even if the tick is cut short by
+        maxCommandChainLength. In 'dispatch' mode '<name>/loop' runs every tick until the last
+        non-empty tick and calls '<name>/dispatch', see compile_dispatch.
+
+        Args:
+            namespace (str, optional): Namespace of the generated calls (self.namespace by default).
+            on_function (Callable[[MCFunction], Any], optional): Called with every function before its
+                events are added, e.g. Save.add_function so stream-mode functions are written while filled.
+
+        Returns:
+            List[MCFunction]: The entry point '<name>/start' followed by the tick functions.
+        """
+        namespace = namespace or self.namespace
+        if namespace is None:
+            raise ValueError(f'Timeline {self.name} has no namespace')
+        if self.mode == 'dispatch':
+            return self.compile_dispatch(namespace, on_function)
+        if self.mode != 'schedule':
+            raise ValueError(f'Unsupported timeline mode: {self.mode}')
+        start = MCFunction(f'{self.name}/start', namespace=namespace)
+        if on_function is not None:
+            on_function(start)
+        functions = [start]
+
+        buckets = list(self.buckets())
+        if buckets:
+            first = f'{namespace}:{self.get_function_name(buckets[0][0])}'
+            start.add_command(f'function {first}' if buckets[0][0] == 0 else ScheduleEvent(first, buckets[0][0]).command)
+        for i, (tick, events) in enumerate(buckets):
+            function = MCFunction(self.get_function_name(tick), namespace=namespace, stream=self.stream,
+                                  dedup=self.dedup)
+            if on_function is not None:
+                on_function(function)
+            if i + 1 < len(buckets):
+                next_tick = buckets[i + 1][0]
+                function.add_command(ScheduleEvent(f'{namespace}:{self.get_function_name(next_tick)}', next_tick - tick).command)
+            function.add_events(*events)
+            functions.append(function)
+        return functions
+
+    def compile_dispatch(self, namespace: str = None, on_function: Callable[[MCFunction], Any] = None) -> List[MCFunction]:
+        """Compile the timeline into a scoreboard tick loop and a dispatch tree over the tick functions.
+
+        '<name>/start' resets the counter and runs '<name>/loop', which calls '<name>/dispatch',
+        increments the counter and schedules itself for the next tick while the counter has not
+        passed the last non-empty tick. Setting the score seeks, the tick functions never schedule.
+
+        Args:
+            namespace (str, optional): Namespace of the generated calls (self.namespace by default).
+            on_function (Callable[[MCFunction], Any], optional): Called with every function before its
+                commands are added.
+
+        Returns:
+            List[MCFunction]: '<name>/start', '<name>/loop', the dispatch tree and the tick functions.
+        """
+        namespace = namespace or self.namespace
+        if namespace is None:
+            raise ValueError(f'Timeline {self.name} has no namespace')
+        score = f'{self.holder} {self.objective}'
+        start = MCFunction(f'{self.name}/start', namespace=namespace)
+        loop = MCFunction(f'{self.name}/loop', namespace=namespace)
+        for function in (start, loop):
+            if on_function is not None:
+                on_function(function)
+
+        targets: Dict[int, MCFunction] = {}
+        for tick, events in self.buckets():
+            function = MCFunction(self.get_function_name(tick), namespace=namespace, stream=self.stream,
+                                  dedup=self.dedup)
+            if on_function is not None:
+                on_function(function)
+            function.add_events(*events)
+            targets[tick] = function
+        dispatchers = dispatch_tree(targets, f'{self.name}/dispatch', self.objective, self.holder, namespace,
+                                    self.fan_out, on_function) if targets else []
+
+        start.add_command(f'scoreboard objectives add {self.objective} dummy')
+        start.add_command(f'scoreboard players set {score} 0')
+        start.add_events(FunctionEvent(loop))
+        if dispatchers:
+            loop.add_events(FunctionEvent(dispatchers[0]))
+            loop.add_command(f'scoreboard players add {score} 1')
+            loop.add_events(ExecuteEvent([f'if score {score} matches ..{max(targets)}'], ScheduleEvent(loop, 1)))
+        return [start, loop] + dispatchers + list(targets.values())
@@ -1,10 +1,12 @@
+import functools
 import math
 import random
-from typing import Any, Callable, Tuple
+import string
+import types
+from typing import Any, Callable, List, Sequence, Tuple
 
-import sympy
-
-from .draw import Color
+from . import config
+from .draw import Color, ColorArray
 
 
 class Enum:
@@ -35,6 +37,20 @@ class Enum:
         ]
         return color_blocks[index % len(color_blocks)]
 
+    @staticmethod
+    def get_nearest_color_block(colors: ColorArray | Sequence, space: str = 'oklab') -> List[str]:
+        """Enum color block closest to each color
+        :param colors: ColorArray, or colors accepted by Color
+        :param space: 'oklab' or 'rgb'
+        :return: block names, same as get_color_block
+        """
+        # Average texture colors, in the same order as get_color_block
+        palette = ColorArray.from_hex([
+                "#080A0F", "#2D2F8F", "#603C20", "#157788", "#373A3E", "#495B24", "#2389C7", "#7D7D73",
+                "#5EA918", "#A9309F", "#E06101", "#D5658F", "#64209C", "#8E2121", "#CFD5D6", "#F1AF15",
+        ])
+        return [Enum.get_color_block(index) for index in ColorArray(colors).nearest(palette, space).tolist()]
+
     @staticmethod
     def get_color_falling_block(index: int) -> str:
         """Enum color falling block
@@ -90,11 +106,189 @@ class Enum:
         return colors[index % len(colors)]
 
 
+class TraceExp:
+    # 轻量符号追踪器，支持more-particle表达式常用的运算，无法追踪时回退到sympy
+    __slots__ = ('text', 'precedence')
+
+    # 优先级：比较 < 加减 < 乘除 < 一元负号 < 乘方 < 原子
+    COMPARE, ADD, MUL, NEG, POW, ATOM = range(6)
+
+    def __init__(self, text: str, precedence: int = ATOM):
+        self.text = text
+        self.precedence = precedence
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return self.text
+
+    @staticmethod
+    def wrap(value: Any) -> 'TraceExp':
+        if isinstance(value, TraceExp):
+            return value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f'Cannot trace {type(value).__name__}')
+        return TraceExp(repr(value), TraceExp.NEG if value < 0 else TraceExp.ATOM)
+
+    @staticmethod
+    def binary(a: Any, b: Any, op: str, precedence: int) -> 'TraceExp':
+        a, b = TraceExp.wrap(a), TraceExp.wrap(b)
+        if precedence == TraceExp.POW:
+            # 乘方右结合
+            left = a.precedence <= precedence
+            right = b.precedence < precedence
+        else:
+            left = a.precedence < precedence
+            right = b.precedence < precedence or b.precedence == TraceExp.NEG or (b.precedence == precedence and op in (' - ', '/'))
+        return TraceExp(f"{f'({a})' if left else a}{op}{f'({b})' if right else b}", precedence)
+
+    def __add__(self, other):
+        return TraceExp.binary(self, other, ' + ', TraceExp.ADD)
+
+    def __radd__(self, other):
+        return TraceExp.binary(other, self, ' + ', TraceExp.ADD)
+
+    def __sub__(self, other):
+        return TraceExp.binary(self, other, ' - ', TraceExp.ADD)
+
+    def __rsub__(self, other):
+        return TraceExp.binary(other, self, ' - ', TraceExp.ADD)
+
+    def __mul__(self, other):
+        return TraceExp.binary(self, other, '*', TraceExp.MUL)
+
+    def __rmul__(self, other):
+        return TraceExp.binary(other, self, '*', TraceExp.MUL)
+
+    def __truediv__(self, other):
+        return TraceExp.binary(self, other, '/', TraceExp.MUL)
+
+    def __rtruediv__(self, other):
+        return TraceExp.binary(other, self, '/', TraceExp.MUL)
+
+    def __pow__(self, other):
+        return TraceExp.binary(self, other, '**', TraceExp.POW)
+
+    def __rpow__(self, other):
+        return TraceExp.binary(other, self, '**', TraceExp.POW)
+
+    def __neg__(self):
+        return TraceExp(f'-({self})' if self.precedence < TraceExp.POW else f'-{self}', TraceExp.NEG)
+
+    def __pos__(self):
+        return self
+
+    def __lt__(self, other):
+        return TraceExp.binary(self, other, ' < ', TraceExp.COMPARE)
+
+    def __le__(self, other):
+        return TraceExp.binary(self, other, ' <= ', TraceExp.COMPARE)
+
+    def __gt__(self, other):
+        return TraceExp.binary(self, other, ' > ', TraceExp.COMPARE)
+
+    def __ge__(self, other):
+        return TraceExp.binary(self, other, ' >= ', TraceExp.COMPARE)
+
+    def __bool__(self):
+        raise TypeError('Cannot determine truth value of a traced expression')
+
+    # numpy对object数组调用同名方法，支持np.sin(t)/np.cos(t)
+    def sin(self):
+        return TraceExp(f'sin({self})')
+
+    def cos(self):
+        return TraceExp(f'cos({self})')
+
+
+def _traceable(func: Callable) -> Callable:
+    """If any argument is a TraceExp, return the formatted string as a TraceExp so it can take part in arithmetic.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        result = func(*args)
+        if any(isinstance(arg, TraceExp) for arg in args):
+            return TraceExp(result)
+        return result
+
+    return wrapper
+
+
+_CONSTANT_TYPES = (int, float, complex, str, bytes, bool, type(None))
+_IDENTITY_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type)
+
+
+def _key_value(value: Any) -> Any:
+    # 常量按值、模块/函数/类按身份作为缓存键，其他可变对象无法缓存
+    if isinstance(value, _CONSTANT_TYPES):
+        return value
+    if isinstance(value, tuple):
+        return tuple(_key_value(v) for v in value)
+    if isinstance(value, _IDENTITY_TYPES) or type(value).__name__ == 'ufunc':
+        return 'id', id(value)
+    raise TypeError
+
+
+class _FuncKey:
+    __slots__ = ('func', 'key')
+
+    def __init__(self, func: Callable, key: tuple):
+        self.func = func
+        self.key = key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def _func_key(func: Callable) -> _FuncKey | None:
+    """Build a cache key from the bytecode, defaults, closure and referenced globals of a function.
+    """
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return None
+    try:
+        closure = tuple(_key_value(c.cell_contents) for c in func.__closure__ or ())
+        defaults = _key_value(func.__defaults__ or ())
+        kwdefaults = _key_value(tuple(sorted((func.__kwdefaults__ or {}).items())))
+        used_globals = tuple((n, _key_value(func.__globals__[n])) for n in code.co_names if n in func.__globals__)
+        return _FuncKey(func, (code, closure, defaults, kwdefaults, used_globals))
+    except (TypeError, ValueError):
+        return None
+
+
+def _convert(func: Callable, var: str) -> str:
+    try:
+        result = func(TraceExp(var))
+    except Exception:
+        pass
+    else:
+        if isinstance(result, (TraceExp, str, int, float)):
+            return str(result)
+    # sympy导入很慢，只在追踪失败时加载
+    import sympy
+    t = sympy.symbols(var)
+    return str(func(t))
+
+
+@functools.lru_cache(maxsize=config.expression_cache_size)
+def _convert_cached(func_key: _FuncKey, var: str) -> str:
+    return _convert(func_key.func, var)
+
+
 def func2math_exp(func: Callable | str,
                   var: str = 't'
                   ) -> str:
     """Convert a Python function to a mathematical expression.
 
+    Functions are traced with TraceExp first and only fall back to sympy when tracing fails.
+    Results are cached by bytecode, defaults, closure values and referenced globals, functions
+    closing over mutable objects are not cached.
+
     Args:
         func: Python function
         var: Variable name
@@ -106,9 +300,149 @@ def func2math_exp(func: Callable | str,
         return str(func)
     elif isinstance(func, str):
         return func
+    elif isinstance(func, TraceExp):
+        return str(func)
     else:
-        t = sympy.symbols(var)
-        return func(t)
+        func_key = _func_key(func)
+        if func_key is None:
+            return _convert(func, var)
+        return _convert_cached(func_key, var)
+
+
+def round_constant(values: Any, precision: int) -> Any:
+    """
+    Round numbers written into expressions, -0.0 becomes 0.0 so that repr() gives the shortest text without a sign.
+    :param values: a number or an array of numbers
+    :param precision: decimals to keep, negative values round to tens, hundreds...
+    :return: a float64 scalar or array
+    """
+    import numpy as np
+    # Adding 0.0 turns -0.0 into 0.0
+    return np.round(np.asarray(values, dtype=np.float64), precision) + 0.0
+
+
+@functools.lru_cache(maxsize=config.expression_cache_size)
+def _parse_template(template: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]]:
+    """Split a template into literal texts and (name, format_spec) fields, validated once per template string.
+    """
+    literals, fields = [], []
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise ValueError(f'Invalid expression template {template!r}: {e}') from None
+    text = ''
+    for literal, name, spec, conversion in parsed:
+        text += literal
+        if name is None:
+            continue
+        if not name.isidentifier() or conversion:
+            raise ValueError(f'Invalid field {{{name}}} in expression template {template!r}')
+        literals.append(text)
+        fields.append((name, spec or ''))
+        text = ''
+    literals.append(text)
+
+    depth = 0
+    for char in ''.join(literals):
+        depth += (char == '(') - (char == ')')
+        if depth < 0:
+            break
+    if depth != 0:
+        raise ValueError(f'Unbalanced parentheses in expression template {template!r}')
+    return tuple(literals), tuple(fields)
+
+
+class ExprTemplate:
+    __slots__ = ('template', 'precision', '_literals', '_fields')
+
+    def __init__(self, template: str, precision: int = 5):
+        """
+        Expression with {name} fields, parsed and validated once and rendered for many parameter values.
+        Numbers are rounded to precision decimals and written in their shortest form, negative numbers in
+        parentheses, a format spec such as {x:.2f} is used as given.
+        :param template: e.g. '(t/{T})*{x}'
+        :param precision: decimals of float parameters
+        """
+        self.template = template
+        self.precision = precision
+        self._literals, self._fields = _parse_template(template)
+
+    def __str__(self) -> str:
+        return self.template
+
+    def __repr__(self) -> str:
+        return f'ExprTemplate({self.template!r})'
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """
+        Names of the fields, in order of first use.
+        """
+        return tuple(dict.fromkeys(name for name, _ in self._fields))
+
+    def _texts(self, value: Any, spec: str) -> List[str]:
+        import numpy as np
+        if isinstance(value, str):
+            return [value]
+        array = np.asarray(value).reshape(-1)
+        if array.dtype.kind in 'iub':
+            values = array.astype(np.int64).tolist()
+        elif array.dtype.kind == 'f':
+            values = (array if spec else round_constant(array, self.precision)).tolist()
+        else:
+            return [str(v) for v in array.tolist()]
+        if spec:
+            return [f'({v:{spec}})' if v < 0 else f'{v:{spec}}' for v in values]
+        return [f'({v!r})' if v < 0 else repr(v) for v in values]
+
+    def render_many(self, **params: Any) -> List[str]:
+        """
+        Render one expression per row of the parameters with a single % operation.
+        :param params: a value for every field, scalars or arrays with shape (N,), strings are inserted as they are
+        :return: N expressions, one if all parameters are scalars
+        """
+        missing = [name for name in self.fields if name not in params]
+        unknown = [name for name in params if name not in self.fields]
+        if missing or unknown:
+            raise ValueError(f'Expression template {self.template!r} got missing fields {missing}, unknown fields {unknown}')
+        texts = {}
+        size = 1
+        for name, spec in dict.fromkeys(self._fields):
+            texts[name, spec] = self._texts(params[name], spec)
+            if len(texts[name, spec]) != 1:
+                if size not in (1, len(texts[name, spec])):
+                    raise ValueError(f'Field {name} has {len(texts[name, spec])} values, expected {size}')
+                size = len(texts[name, spec])
+
+        # Scalars are baked into the printf template, arrays become its %s columns
+        template, columns = self._literals[0].replace('%', '%%'), []
+        for field, literal in zip(self._fields, self._literals[1:]):
+            text = texts[field]
+            if len(text) == 1:
+                template += text[0].replace('%', '%%')
+            else:
+                template += '%s'
+                columns.append(text)
+            template += literal.replace('%', '%%')
+        if not size:
+            return []
+        if not columns:
+            return [template.replace('%%', '%')] * size
+        if '\n' in template:
+            raise ValueError('Expression templates cannot contain newlines')
+        values = tuple([text for row in zip(*columns) for text in row]) if len(columns) > 1 else tuple(columns[0])
+        return ('\n'.join([template] * size) % values).split('\n')
+
+    def render(self, **params: Any) -> str:
+        """
+        Render a single expression.
+        :param params: a scalar value for every field
+        :return: the expression
+        """
+        result = self.render_many(**params)
+        if len(result) != 1:
+            raise ValueError(f'render() got {len(result)} rows, use render_many()')
+        return result[0]
 
 
 def delta(*args) -> Tuple[str,]:
@@ -122,6 +456,7 @@ def delta(*args) -> Tuple[str,]:
     return tuple(str_list)
 
 
+@_traceable
 def mp_clamp(value: Any, min_value: Any, max_value: Any) -> str:
     """mp_clamp
     :param value:
@@ -132,6 +467,7 @@ def mp_clamp(value: Any, min_value: Any, max_value: Any) -> str:
     return f'clamp({value},{min_value},{max_value})'
 
 
+@_traceable
 def mp_min(a, b) -> str:
     """mp_min
     :param a:
@@ -141,6 +477,7 @@ def mp_min(a, b) -> str:
     return f'min({a},{b})'
 
 
+@_traceable
 def mp_max(a, b) -> str:
     """mp_max
     :param a:
@@ -150,6 +487,7 @@ def mp_max(a, b) -> str:
     return f'max({a},{b})'
 
 
+@_traceable
 def mp_if(condition: str, if_true: Any, if_false: Any) -> str:
     """mp_if
     :param condition:
@@ -160,6 +498,7 @@ def mp_if(condition: str, if_true: Any, if_false: Any) -> str:
     return f'if({condition},{if_true},{if_false})'
 
 
+@_traceable
 def mp_deg(x: Any) -> str:
     """mp_degrees
     :param x:
@@ -168,6 +507,7 @@ def mp_deg(x: Any) -> str:
     return f'deg({x})'
 
 
+@_traceable
 def mp_radian(x: Any) -> str:
     """mp_radian
     :param x:
@@ -176,6 +516,7 @@ def mp_radian(x: Any) -> str:
     return f'rad({x})'
 
 
+@_traceable
 def mp_and(a, b) -> str:
     """mp_and
     :param a:
@@ -185,6 +526,7 @@ def mp_and(a, b) -> str:
     return f'and({a},{b})'
 
 
+@_traceable
 def mp_or(a, b) -> str:
     """mp_or
     :param a:
@@ -194,6 +536,7 @@ def mp_or(a, b) -> str:
     return f'or({a},{b})'
 
 
+@_traceable
 def mp_rgb(r: Any, g: Any, b: Any) -> str:
     """mp_rgb
     :param r:
@@ -204,6 +547,7 @@ def mp_rgb(r: Any, g: Any, b: Any) -> str:
     return f'rgb({func2math_exp(r)},{func2math_exp(g)},{func2math_exp(b)})'
 
 
+@_traceable
 def mp_sin(x: Any) -> str:
     """mp_sin
     :param x:
@@ -212,6 +556,7 @@ def mp_sin(x: Any) -> str:
     return f'sin({x})'
 
 
+@_traceable
 def mp_cos(x: Any) -> str:
     """mp_cos
     :param x: